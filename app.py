@@ -1,14 +1,17 @@
 import os
 import uuid
-import sqlite3
 from dotenv import load_dotenv
 import streamlit as st
-from utils.pdf_handler import handle_multiple_pdfs, create_pdf_embeddings, combine_indices
-from backend.chatbot import handle_user_message
+from utils.pdf_handler import process_uploaded_pdfs, combine_indices
+from backend.chat_history import init_chat_db, save_chat_message, get_chat_history_page
+from backend.api_client import chat, chat_stream
+from backend.chatbot import handle_user_message, handle_user_message_stream
 from utils.logger import setup_logger
-import faiss
-import numpy as np
-from config import HF_MODEL_NAME, LLM_MODEL_URL, DATABASE_PATH, HUGGINGFACE_API_KEY
+from utils.metrics import start_metrics_server
+from utils.resource_cache import acquire_training_data, session_bytes, shared_resources
+from config import HF_MODEL_NAME, LLM_MODEL_URL, LLM_STREAMING, DATABASE_PATH, HUGGINGFACE_API_KEY
+from config import FAISS_INDEX_PATH, TRAINING_SENTENCES_PATH, LEGACY_TRAINING_SENTENCES_PATH, CHAT_API_URL
+from config import METRICS_PORT
 
 # Load environment variables
 load_dotenv(dotenv_path="api/api.env")
@@ -25,12 +28,20 @@ logger = setup_logger()
 
 logger.info("NEXA HR Chatbot application started.")
 
-# Load pre-trained FAISS index and sentences
+# Expose per-stage latency metrics; the server is started once per process, not per rerun
+if METRICS_PORT:
+    start_metrics_server(METRICS_PORT)
+
+# Attach to the pre-trained FAISS index and sentences, which are loaded once per process and shared
+# by every session. The session only keeps a handle, released when the session state is dropped.
+# With CHAT_API_URL set, chat answers come from the chat service's own copy of the index instead.
 if "training_index" not in st.session_state:
     try:
-        st.session_state["training_index"] = faiss.read_index("data/training_index.faiss")
-        st.session_state["training_sentences"] = np.load("data/training_sentences.npy", allow_pickle=True)
-        logger.info("Pre-trained FAISS index and sentences loaded successfully.")
+        sentences_path = TRAINING_SENTENCES_PATH if os.path.exists(TRAINING_SENTENCES_PATH) else LEGACY_TRAINING_SENTENCES_PATH
+        training_handle = acquire_training_data(FAISS_INDEX_PATH, sentences_path)
+        st.session_state["training_handle"] = training_handle
+        st.session_state["training_index"], st.session_state["training_sentences"] = training_handle.value
+        logger.info(f"Pre-trained FAISS index and sentences attached successfully. Shared memory: {shared_resources.stats()}")
     except FileNotFoundError:
         st.session_state["training_index"] = None
         st.session_state["training_sentences"] = None
@@ -51,41 +62,16 @@ if "combined_sentences" not in st.session_state:
 if "session_id" not in st.session_state:
     st.session_state["session_id"] = str(uuid.uuid4())  # Generate a unique session ID
 
-# SQLite database functions
-def init_chat_db(db_path="data/chat_history.db"):
-    conn = sqlite3.connect(db_path)
-    cursor = conn.cursor()
-    cursor.execute("""
-        CREATE TABLE IF NOT EXISTS chat_history (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            session_id TEXT,
-            user_message TEXT,
-            bot_response TEXT
-        )
-    """)
-    conn.commit()
-    conn.close()
-
-def save_chat_message(session_id, user_message, bot_response, db_path="data/chat_history.db"):
-    conn = sqlite3.connect(db_path)
-    cursor = conn.cursor()
-    cursor.execute("""
-        INSERT INTO chat_history (session_id, user_message, bot_response)
-        VALUES (?, ?, ?)
-    """, (session_id, user_message, bot_response))
-    conn.commit()
-    conn.close()
-
-def get_chat_history(session_id, db_path="data/chat_history.db"):
-    conn = sqlite3.connect(db_path)
-    cursor = conn.cursor()
-    cursor.execute("""
-        SELECT user_message, bot_response FROM chat_history
-        WHERE session_id = ?
-    """, (session_id,))
-    history = cursor.fetchall()
-    conn.close()
-    return history
+def render_chat_turn(user_message, bot_response):
+    """
+    Renders one chat turn as HTML; turns are rendered once and cached in the session state.
+    """
+    html = ""
+    if user_message:
+        html += f'<div class="chat-message user"><p>{user_message}</p></div>\n'
+    if bot_response:
+        html += f'<div class="chat-message bot"><p>{bot_response}</p></div>\n'
+    return html
 
 # Initialize the chat database
 init_chat_db()
@@ -158,13 +144,14 @@ with content_wrapper:
     elif page == "Upload Documents":
         st.title("Upload Documents")
         st.write("Does NEXA not have information on something, but you have a document,\nand you're lazy to skim through? Upload it here!")
+        if CHAT_API_URL:
+            st.info("Chat is served by the NEXA chat API, which only searches the pre-trained documents.")
         uploaded_files = st.file_uploader("Choose PDF files", type="pdf", accept_multiple_files=True)
 
         if uploaded_files:
             try:
-                # Process uploaded PDFs
-                user_text = handle_multiple_pdfs(uploaded_files)
-                user_sentences, user_embeddings = create_pdf_embeddings(user_text)
+                # Process uploaded PDFs (cached by file content, so reruns skip re-parsing and re-encoding)
+                user_sentences, user_embeddings = process_uploaded_pdfs(uploaded_files)
 
                 # Combine with pre-trained FAISS index
                 if training_index is not None and training_sentences is not None:
@@ -173,7 +160,11 @@ with content_wrapper:
                     )
                     st.session_state["combined_index"] = combined_index
                     st.session_state["combined_sentences"] = combined_sentences
-                    logger.info("Combined FAISS index created successfully.")
+                    logger.info(
+                        f"Combined FAISS index created successfully. Session memory: "
+                        f"{session_bytes(combined_index, combined_sentences)} bytes, "
+                        f"shared memory: {shared_resources.shared_bytes()} bytes"
+                    )
                     st.success("PDF files processed and combined with pre-trained data successfully!")
                 else:
                     st.session_state["combined_index"] = None
@@ -210,16 +201,27 @@ with content_wrapper:
         if st.button("Update LLM"):
             update_config_with_comments(AVAILABLE_LLMS[selected_llm])
 
-        # Initialize the chatbot's greeting message if it's a new session
-        if not get_chat_history(st.session_state["session_id"]):
-            save_chat_message(
-                st.session_state["session_id"],
-                user_message=None,
-                bot_response="Hello! I am NEXA, your HR assistant. How can I help you today?"
-            )
+        # Load the latest page of chat history once per session; reruns reuse the rendered blocks
+        session_id = st.session_state["session_id"]
+        if "chat_blocks" not in st.session_state:
+            chat_history, cursor, has_more = get_chat_history_page(session_id)
+
+            # Initialize the chatbot's greeting message if it's a new session
+            if not chat_history:
+                greeting = "Hello! I am NEXA, your HR assistant. How can I help you today?"
+                save_chat_message(session_id, user_message=None, bot_response=greeting)
+                chat_history = [(None, greeting)]
 
-        # Retrieve chat history for the current session
-        chat_history = get_chat_history(st.session_state["session_id"])
+            st.session_state["chat_blocks"] = [render_chat_turn(user, bot) for user, bot in chat_history]
+            st.session_state["chat_cursor"] = cursor
+            st.session_state["chat_has_more"] = has_more
+
+        # Older pages are fetched on demand, walking back from the oldest loaded turn
+        if st.session_state["chat_has_more"] and st.button("Load older messages"):
+            older, cursor, has_more = get_chat_history_page(session_id, before=st.session_state["chat_cursor"])
+            st.session_state["chat_blocks"][:0] = [render_chat_turn(user, bot) for user, bot in older]
+            st.session_state["chat_cursor"] = cursor
+            st.session_state["chat_has_more"] = has_more
 
         # Create a container for the chat messages
         chat_container = st.container()
@@ -227,19 +229,7 @@ with content_wrapper:
         # Display previous chat messages above the input field
         with chat_container:
             st.markdown("---")
-            for user_message, bot_response in chat_history:
-                if user_message:
-                    st.markdown(f"""
-                    <div class="chat-message user">
-                        <p>{user_message}</p>
-                    </div>
-                    """, unsafe_allow_html=True)
-                if bot_response:
-                    st.markdown(f"""
-                    <div class="chat-message bot">
-                        <p>{bot_response}</p>
-                    </div>
-                    """, unsafe_allow_html=True)
+            st.markdown("\n".join(st.session_state["chat_blocks"]), unsafe_allow_html=True)
 
         # User Input
         st.markdown("---")
@@ -255,21 +245,9 @@ with content_wrapper:
                     combined_index = st.session_state.get("combined_index", training_index)
                     combined_sentences = st.session_state.get("combined_sentences", training_sentences)
 
-                    if combined_index is None or combined_sentences is None:
+                    if not CHAT_API_URL and (combined_index is None or combined_sentences is None):
                         raise ValueError("Pre-trained data is not available. Please upload documents.")
 
-                    # Process the user input
-                    bot_response = handle_user_message(
-                        user_input,
-                        combined_index,
-                        combined_sentences,
-                        LLM_MODEL_URL
-                    )
-                    print(f"Bot Response: {bot_response}")  # Debug Print
-
-                    # Save the chat message to the database
-                    save_chat_message(st.session_state["session_id"], user_input, bot_response)
-
                     # Render the new message inline at the top of the chat container
                     with chat_container:
                         st.markdown(f"""
@@ -277,11 +255,49 @@ with content_wrapper:
                             <p>{user_input}</p>
                         </div>
                         """, unsafe_allow_html=True)
-                        st.markdown(f"""
-                        <div class="chat-message bot">
-                            <p>{bot_response}</p>
-                        </div>
-                        """, unsafe_allow_html=True)
+                        bot_placeholder = st.empty()
+
+                    # Process the user input, rendering the response as it is generated
+                    if LLM_STREAMING:
+                        bot_response = ""
+                        if CHAT_API_URL:
+                            tokens = chat_stream(user_input, LLM_MODEL_URL, st.session_state["session_id"])
+                        else:
+                            tokens = handle_user_message_stream(
+                                user_input,
+                                combined_index,
+                                combined_sentences,
+                                LLM_MODEL_URL,
+                                session_id=st.session_state["session_id"]
+                            )
+                        for token in tokens:
+                            bot_response += token
+                            bot_placeholder.markdown(f"""
+                            <div class="chat-message bot">
+                                <p>{bot_response}▌</p>
+                            </div>
+                            """, unsafe_allow_html=True)
+                    elif CHAT_API_URL:
+                        bot_response = chat(user_input, LLM_MODEL_URL, st.session_state["session_id"])
+                    else:
+                        bot_response = handle_user_message(
+                            user_input,
+                            combined_index,
+                            combined_sentences,
+                            LLM_MODEL_URL,
+                            session_id=st.session_state["session_id"]
+                        )
+                    print(f"Bot Response: {bot_response}")  # Debug Print
+
+                    bot_placeholder.markdown(f"""
+                    <div class="chat-message bot">
+                        <p>{bot_response}</p>
+                    </div>
+                    """, unsafe_allow_html=True)
+
+                    # Save the chat message to the database once the full response is known
+                    save_chat_message(st.session_state["session_id"], user_input, bot_response)
+                    st.session_state["chat_blocks"].append(render_chat_turn(user_input, bot_response))
 
                 except Exception as e:
                     print(f"Error: {e}")  # Debug Print
@@ -0,0 +1,204 @@
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+
+import numpy as np
+
+from config import (
+    ANSWER_CACHE_PATH,
+    ANSWER_CACHE_SIMILARITY,
+    ANSWER_CACHE_TTL,
+    ANSWER_CACHE_MAX_ENTRIES,
+    FAISS_INDEX_PATH,
+    TRAINING_SENTENCES_PATH,
+    LEGACY_TRAINING_SENTENCES_PATH,
+)
+from utils.logger import setup_logger
+from utils.resource_cache import file_version
+
+logger = setup_logger()
+
+def current_index_version(paths=(FAISS_INDEX_PATH, TRAINING_SENTENCES_PATH, LEGACY_TRAINING_SENTENCES_PATH)):
+    """
+    Identifies the pre-trained index on disk; it changes whenever the index or its sentences are rebuilt.
+    """
+    versions = [f"{path}:{mtime}" for path, mtime in (file_version(p) for p in paths if os.path.exists(p))]
+    return hashlib.sha1("|".join(versions).encode("utf-8")).hexdigest()
+
+def context_key(ids, context):
+    """
+    Identifies a retrieved context by its sentence ids and text. The text is included because ids
+    of uploaded sentences are only meaningful within the session that uploaded them.
+    """
+    return hashlib.sha1(f"{','.join(map(str, ids))}\0{context}".encode("utf-8")).hexdigest()
+
+def _unit(vector):
+    vector = np.asarray(vector, dtype="float32").reshape(-1)
+    norm = np.linalg.norm(vector)
+    return vector / norm if norm else vector
+
+class AnswerCache:
+    """
+    Persistent semantic cache of LLM answers.
+
+    An answer is reused for a new question when the question's embedding is within `threshold`
+    cosine similarity of a cached question that had the same model and retrieved context.
+    Entries expire after `ttl` seconds, the least recently used are evicted beyond max_entries,
+    and everything is dropped when the index version changes.
+    """
+
+    def __init__(self, db_path=ANSWER_CACHE_PATH, threshold=ANSWER_CACHE_SIMILARITY, ttl=ANSWER_CACHE_TTL,
+                 max_entries=ANSWER_CACHE_MAX_ENTRIES):
+        self.db_path = db_path
+        self.threshold = threshold
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._conn = None
+        self._groups = {}  # (model, context key) -> {row id: [unit embedding, answer, created_at, last_used]}
+        self._index_version = None
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def _connect(self):
+        # Opened lazily so importing the module has no side effects; called with the lock held
+        if self._conn is not None:
+            return
+        os.makedirs(os.path.dirname(self.db_path) or ".", exist_ok=True)
+        self._conn = sqlite3.connect(self.db_path, check_same_thread=False)
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS answers (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                model TEXT NOT NULL,
+                context_key TEXT NOT NULL,
+                index_version TEXT NOT NULL,
+                embedding BLOB NOT NULL,
+                question TEXT,
+                answer TEXT NOT NULL,
+                created_at REAL NOT NULL,
+                last_used REAL NOT NULL
+            )
+        """)
+        self._conn.commit()
+
+        loaded = 0
+        for row_id, model, key, version, embedding, answer, created_at, last_used in self._conn.execute(
+            "SELECT id, model, context_key, index_version, embedding, answer, created_at, last_used FROM answers"
+        ):
+            self._index_version = version
+            vector = np.frombuffer(embedding, dtype="float32")
+            self._groups.setdefault((model, key), {})[row_id] = [vector, answer, created_at, last_used]
+            loaded += 1
+        logger.info(f"Loaded {loaded} cached answers from {self.db_path}")
+
+    def _check_version(self, index_version):
+        if index_version == self._index_version:
+            return
+        if self._groups:
+            logger.info("Index version changed; clearing the answer cache.")
+            self.evictions += sum(len(group) for group in self._groups.values())
+        self._groups.clear()
+        self._conn.execute("DELETE FROM answers")
+        self._conn.commit()
+        self._index_version = index_version
+
+    def _expired(self, created_at, now):
+        return self.ttl is not None and now - created_at > self.ttl
+
+    def get(self, query_embedding, model, context_key, index_version):
+        """
+        Returns the cached answer for a similar question with the same model and context, or None.
+        """
+        query = _unit(query_embedding)
+        now = time.time()
+        with self._lock:
+            self._connect()
+            self._check_version(index_version)
+            group = self._groups.get((model, context_key), {})
+
+            expired = [row_id for row_id, entry in group.items() if self._expired(entry[2], now)]
+            for row_id in expired:
+                del group[row_id]
+            if expired:
+                self.evictions += len(expired)
+                self._conn.executemany("DELETE FROM answers WHERE id = ?", [(row_id,) for row_id in expired])
+
+            best_id, best_score = None, self.threshold
+            for row_id, entry in group.items():
+                score = float(np.dot(query, entry[0]))
+                if score >= best_score:
+                    best_id, best_score = row_id, score
+
+            if best_id is None:
+                self.misses += 1
+                self._conn.commit()
+                return None
+            entry = group[best_id]
+            entry[3] = now
+            self._conn.execute("UPDATE answers SET last_used = ? WHERE id = ?", (now, best_id))
+            self._conn.commit()
+            self.hits += 1
+            logger.info(f"Answer cache hit (similarity {best_score:.3f})")
+            return entry[1]
+
+    def put(self, query_embedding, model, context_key, index_version, answer, question=None):
+        """
+        Stores an answer, evicting the least recently used entries beyond max_entries.
+        """
+        if self.max_entries <= 0:
+            return
+        vector = _unit(query_embedding)
+        now = time.time()
+        with self._lock:
+            self._connect()
+            self._check_version(index_version)
+            cursor = self._conn.execute(
+                "INSERT INTO answers (model, context_key, index_version, embedding, question, answer, created_at, last_used) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (model, context_key, index_version, vector.tobytes(), question, answer, now, now),
+            )
+            self._groups.setdefault((model, context_key), {})[cursor.lastrowid] = [vector, answer, now, now]
+            self._evict_over_size()
+            self._conn.commit()
+
+    def _evict_over_size(self):
+        size = sum(len(group) for group in self._groups.values())
+        if size <= self.max_entries:
+            return
+        entries = sorted(
+            (entry[3], row_id, group_key)
+            for group_key, group in self._groups.items()
+            for row_id, entry in group.items()
+        )
+        evicted = entries[:size - self.max_entries]
+        for _, row_id, group_key in evicted:
+            del self._groups[group_key][row_id]
+            if not self._groups[group_key]:
+                del self._groups[group_key]
+        self._conn.executemany("DELETE FROM answers WHERE id = ?", [(row_id,) for _, row_id, _ in evicted])
+        self.evictions += len(evicted)
+
+    def clear(self):
+        with self._lock:
+            self._connect()
+            self._groups.clear()
+            self._conn.execute("DELETE FROM answers")
+            self._conn.commit()
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": sum(len(group) for group in self._groups.values()),
+                "max_entries": self.max_entries,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+            }
+
+# Shared by every session in the process
+answer_cache = AnswerCache()
@@ -0,0 +1,50 @@
+import json
+
+import requests
+
+from config import CHAT_API_URL, HTTP_CONNECT_TIMEOUT, HTTP_READ_TIMEOUT, LLM_REQUEST_DEADLINE
+from utils.http_client import get_session, post_json, post_stream
+
+# The service may retry the LLM until its own deadline, so allow for that on top of the read timeout
+TIMEOUT = (HTTP_CONNECT_TIMEOUT, HTTP_READ_TIMEOUT + LLM_REQUEST_DEADLINE)
+
+def chat(user_input, model_name, session_id=None, api_url=CHAT_API_URL):
+    """
+    Sends a chat message to the chat API service and returns the response text.
+    """
+    try:
+        result = post_json(
+            get_session(),
+            f"{api_url.rstrip('/')}/chat",
+            {"message": user_input, "model": model_name, "session_id": session_id},
+            timeout=TIMEOUT,
+        )
+        return result["response"]
+    except requests.exceptions.RequestException as e:
+        raise RuntimeError(f"Chat API request failed: {e}")
+    except (KeyError, TypeError):
+        raise RuntimeError("Unexpected response format from the chat API.")
+
+def chat_stream(user_input, model_name, session_id=None, api_url=CHAT_API_URL):
+    """
+    Streaming version of chat: yields response text as the service streams it.
+    """
+    try:
+        response = post_stream(
+            get_session(),
+            f"{api_url.rstrip('/')}/chat/stream",
+            {"message": user_input, "model": model_name, "session_id": session_id},
+            timeout=TIMEOUT,
+        )
+        with response:
+            for line in response.iter_lines(decode_unicode=True):
+                if not line or not line.startswith("data:"):
+                    continue
+                event = json.loads(line[len("data:"):])
+                if event.get("done"):
+                    return
+                yield event["text"]
+    except requests.exceptions.RequestException as e:
+        raise RuntimeError(f"Chat API request failed: {e}")
+    except (KeyError, TypeError, ValueError):
+        raise RuntimeError("Unexpected response format from the chat API.")
@@ -0,0 +1,207 @@
+import argparse
+import asyncio
+import json
+import multiprocessing
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from aiohttp import web
+
+# Add the root directory to the Python path when run as a script
+ROOT_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+if ROOT_DIR not in sys.path:
+    sys.path.append(ROOT_DIR)
+
+from config import (
+    CHAT_API_HOST,
+    CHAT_API_MODELS,
+    CHAT_API_PORT,
+    CHAT_API_WORKERS,
+    CHAT_API_THREADS,
+    EMBEDDING_MODEL,
+    FAISS_INDEX_PATH,
+    LEGACY_TRAINING_SENTENCES_PATH,
+    LLM_MODEL_URL,
+    TRAINING_SENTENCES_PATH,
+)
+from backend.answer_cache import answer_cache
+from backend.chatbot import first_token_stats, handle_user_message, handle_user_message_stream
+from utils.embedding_model import get_embedding_model
+from utils.http_client import request_stats
+from utils.llm_handler import llm_flights, llm_limiter
+from utils.logger import setup_logger
+from utils.metrics import metrics, new_trace_id, trace
+from utils.micro_batcher import batcher_stats
+from utils.resource_cache import acquire_training_data
+
+logger = setup_logger()
+
+_STREAM_END = object()
+# Any other model is refused: it would receive the Hugging Face API key
+_ALLOWED_MODELS = {LLM_MODEL_URL, *CHAT_API_MODELS}
+
+def _load_shared_state():
+    # Runs once per worker: the index, sentences and embedding model are shared by all requests
+    sentences_path = TRAINING_SENTENCES_PATH if os.path.exists(TRAINING_SENTENCES_PATH) else LEGACY_TRAINING_SENTENCES_PATH
+    handle = acquire_training_data(FAISS_INDEX_PATH, sentences_path)
+    get_embedding_model(EMBEDDING_MODEL)
+    return handle
+
+async def on_startup(app):
+    app["executor"] = ThreadPoolExecutor(max_workers=app["threads"], thread_name_prefix="chat-api")
+    start = time.perf_counter()
+    app["training_handle"] = await asyncio.get_running_loop().run_in_executor(app["executor"], _load_shared_state)
+    logger.info(f"Chat API worker {os.getpid()} ready in {time.perf_counter() - start:.2f}s")
+
+async def on_cleanup(app):
+    app["training_handle"].release()
+    app["executor"].shutdown(wait=False, cancel_futures=True)
+
+async def _read_message(request):
+    try:
+        body = await request.json()
+    except (json.JSONDecodeError, UnicodeDecodeError):
+        raise web.HTTPBadRequest(text="Request body must be JSON.")
+    message = body.get("message") if isinstance(body, dict) else None
+    if not isinstance(message, str) or not message.strip():
+        raise web.HTTPBadRequest(text='"message" must be a non-empty string.')
+    session_id = body.get("session_id")
+    if session_id is not None and not isinstance(session_id, str):
+        raise web.HTTPBadRequest(text='"session_id" must be a string.')
+    model_name = body.get("model") or LLM_MODEL_URL
+    if not isinstance(model_name, str) or model_name not in _ALLOWED_MODELS:
+        raise web.HTTPBadRequest(text='"model" is not served by this API (see CHAT_API_MODELS in config.py).')
+    return message, session_id, model_name
+
+def _trace_id(request):
+    # Callers can pass their own X-Request-Id so their logs and ours share the trace id
+    return request.headers.get("X-Request-Id") or new_trace_id()
+
+async def chat(request):
+    """
+    POST /chat {"message", "session_id"?, "model"?} -> {"response", "elapsed"}
+    """
+    message, session_id, model_name = await _read_message(request)
+    index, sentences = request.app["training_handle"].value
+    trace_id = _trace_id(request)
+    start = time.perf_counter()
+
+    def handle():
+        with trace(trace_id):
+            return handle_user_message(message, index, sentences, model_name, session_id=session_id)
+
+    response = await asyncio.get_running_loop().run_in_executor(request.app["executor"], handle)
+    return web.json_response(
+        {"response": response, "elapsed": time.perf_counter() - start},
+        headers={"X-Trace-Id": trace_id},
+    )
+
+async def chat_stream(request):
+    """
+    POST /chat/stream with the same body as /chat; answers with server-sent events,
+    one `data: {"text": ...}` event per token and a final `data: {"done": true}`.
+    """
+    message, session_id, model_name = await _read_message(request)
+    index, sentences = request.app["training_handle"].value
+    loop = asyncio.get_running_loop()
+    executor = request.app["executor"]
+
+    trace_id = _trace_id(request)
+
+    tokens = handle_user_message_stream(message, index, sentences, model_name, session_id=session_id)
+    response = web.StreamResponse(
+        headers={"Content-Type": "text/event-stream", "Cache-Control": "no-cache", "X-Trace-Id": trace_id}
+    )
+    await response.prepare(request)
+
+    def step():
+        # Pool threads are shared between requests, so the trace id is only set for this step
+        with trace(trace_id):
+            return next(tokens, _STREAM_END)
+
+    try:
+        while True:
+            # Each step of the generator blocks on the upstream stream, so it runs in the pool
+            token = await loop.run_in_executor(executor, step)
+            if token is _STREAM_END:
+                break
+            await response.write(f"data: {json.dumps({'text': token})}\n\n".encode("utf-8"))
+        await response.write(b'data: {"done": true}\n\n')
+    finally:
+        # Closing the generator releases its LLM slot if the client went away mid-stream
+        await loop.run_in_executor(executor, tokens.close)
+    await response.write_eof()
+    return response
+
+async def health(request):
+    index, sentences = request.app["training_handle"].value
+    return web.json_response({"status": "ok", "pid": os.getpid(), "vectors": index.ntotal, "sentences": len(sentences)})
+
+async def prometheus_metrics(request):
+    """
+    GET /metrics: per-stage latency histograms and counters of this worker, in Prometheus text format.
+    """
+    return web.Response(text=metrics.render_prometheus(), content_type="text/plain", headers={"X-Worker-Pid": str(os.getpid())})
+
+async def stats(request):
+    return web.json_response({
+        "pid": os.getpid(),
+        "answer_cache": answer_cache.stats(),
+        "llm_flights": llm_flights.stats(),
+        "llm_limiter": llm_limiter.stats(),
+        "http_requests": request_stats.summary(),
+        "first_token": first_token_stats.summary(),
+        "micro_batching": batcher_stats(),
+    })
+
+def create_app(threads=CHAT_API_THREADS):
+    """
+    Creates the chat API application; shared state is loaded when it starts.
+    """
+    app = web.Application()
+    app["threads"] = threads
+    app.on_startup.append(on_startup)
+    app.on_cleanup.append(on_cleanup)
+    app.router.add_post("/chat", chat)
+    app.router.add_post("/chat/stream", chat_stream)
+    app.router.add_get("/health", health)
+    app.router.add_get("/stats", stats)
+    app.router.add_get("/metrics", prometheus_metrics)
+    return app
+
+def run_worker(host, port, threads):
+    # Every worker binds the same port with SO_REUSEPORT and the kernel balances connections between them
+    web.run_app(create_app(threads), host=host, port=port, reuse_port=True, print=None)
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Serve the NEXA chatbot as a JSON HTTP API.")
+    parser.add_argument("--host", default=CHAT_API_HOST)
+    parser.add_argument("--port", type=int, default=CHAT_API_PORT)
+    parser.add_argument("--workers", type=int, default=CHAT_API_WORKERS, help="Worker processes sharing the port.")
+    parser.add_argument("--threads", type=int, default=CHAT_API_THREADS, help="Threads per worker for blocking calls.")
+    return parser.parse_args(argv)
+
+def main():
+    args = parse_args()
+    print(f"NEXA chat API on http://{args.host}:{args.port}/ with {args.workers} worker(s)")
+    if args.workers <= 1:
+        run_worker(args.host, args.port, args.threads)
+        return
+
+    workers = [
+        multiprocessing.Process(target=run_worker, args=(args.host, args.port, args.threads), daemon=True)
+        for _ in range(args.workers)
+    ]
+    for worker in workers:
+        worker.start()
+    try:
+        for worker in workers:
+            worker.join()
+    except KeyboardInterrupt:
+        for worker in workers:
+            worker.terminate()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,181 @@
+import os
+import queue
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+
+from config import CHAT_HISTORY_DB_PATH, CHAT_HISTORY_PAGE_SIZE, CHAT_HISTORY_POOL_SIZE
+from utils.logger import setup_logger
+from utils.metrics import metrics
+
+logger = setup_logger()
+
+# Statements are kept as constants so sqlite3's per-connection statement cache reuses the prepared forms
+INSERT_MESSAGE = "INSERT INTO chat_history (session_id, user_message, bot_response, created_at) VALUES (?, ?, ?, ?)"
+SELECT_HISTORY = """
+    SELECT user_message, bot_response FROM chat_history
+    WHERE session_id = ?
+    ORDER BY created_at, id
+"""
+# Keyset pagination: walk the (session_id, created_at, id) index backwards from a cursor
+SELECT_LATEST_PAGE = """
+    SELECT id, created_at, user_message, bot_response FROM chat_history
+    WHERE session_id = ?
+    ORDER BY created_at DESC, id DESC
+    LIMIT ?
+"""
+SELECT_PAGE_BEFORE = """
+    SELECT id, created_at, user_message, bot_response FROM chat_history
+    WHERE session_id = ? AND (created_at, id) < (?, ?)
+    ORDER BY created_at DESC, id DESC
+    LIMIT ?
+"""
+
+class ChatHistoryStore:
+    """
+    SQLite-backed chat history. Calls check a connection out of a small pool, so connections (and their
+    prepared statements) are reused across Streamlit reruns, which each run on a new thread. The database
+    runs in WAL mode so page renders never wait for writers, and lookups use the (session_id, created_at) index.
+    """
+
+    def __init__(self, db_path=CHAT_HISTORY_DB_PATH, pool_size=CHAT_HISTORY_POOL_SIZE):
+        self.db_path = db_path
+        self.pool_size = pool_size
+        self._idle = queue.LifoQueue()
+        self._opened = 0
+        self._pool_lock = threading.Lock()
+        self._init_lock = threading.Lock()
+        self._initialized = False
+
+    def _open(self):
+        os.makedirs(os.path.dirname(self.db_path) or ".", exist_ok=True)
+        # A connection is only used by one thread at a time, but not always the same one
+        conn = sqlite3.connect(self.db_path, timeout=10, cached_statements=64, check_same_thread=False)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        return conn
+
+    @contextmanager
+    def _connection(self):
+        """
+        Checks a connection out of the pool for the enclosed block, opening one if fewer than
+        pool_size exist and otherwise waiting for one to be returned.
+        """
+        try:
+            conn = self._idle.get_nowait()
+        except queue.Empty:
+            with self._pool_lock:
+                can_open = self._opened < self.pool_size
+                if can_open:
+                    self._opened += 1
+            if can_open:
+                try:
+                    conn = self._open()
+                except Exception:
+                    with self._pool_lock:
+                        self._opened -= 1
+                    raise
+            else:
+                conn = self._idle.get()
+        try:
+            if not self._initialized:
+                self._init_schema(conn)
+            yield conn
+        finally:
+            self._idle.put(conn)
+
+    def _init_schema(self, conn):
+        with self._init_lock:
+            if self._initialized:
+                return
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS chat_history (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    session_id TEXT,
+                    user_message TEXT,
+                    bot_response TEXT
+                )
+            """)
+            # Databases created before created_at existed are migrated in place; old rows sort first
+            columns = [row[1] for row in conn.execute("PRAGMA table_info(chat_history)")]
+            if "created_at" not in columns:
+                logger.info(f"Adding created_at to chat_history in {self.db_path}")
+                conn.execute("ALTER TABLE chat_history ADD COLUMN created_at REAL")
+                conn.execute("UPDATE chat_history SET created_at = 0 WHERE created_at IS NULL")
+            conn.execute(
+                "CREATE INDEX IF NOT EXISTS idx_chat_history_session ON chat_history (session_id, created_at, id)"
+            )
+            conn.commit()
+            self._initialized = True
+
+    def save_message(self, session_id, user_message, bot_response):
+        """
+        Writes one row and returns its (created_at, id) cursor.
+        """
+        now = time.time()
+        with metrics.span("history_write"), self._connection() as conn:
+            with conn:
+                cursor = conn.execute(INSERT_MESSAGE, (session_id, user_message, bot_response, now))
+        return now, cursor.lastrowid
+
+    def save_messages(self, messages):
+        """
+        Writes (session_id, user_message, bot_response) rows in a single transaction.
+        """
+        now = time.time()
+        with metrics.span("history_write"), self._connection() as conn:
+            with conn:
+                conn.executemany(INSERT_MESSAGE, [(session_id, user, bot, now) for session_id, user, bot in messages])
+
+    def get_history(self, session_id):
+        """
+        Returns a session's (user_message, bot_response) pairs, oldest first.
+        """
+        with metrics.span("history_read"), self._connection() as conn:
+            return conn.execute(SELECT_HISTORY, (session_id,)).fetchall()
+
+    def get_history_page(self, session_id, before=None, limit=CHAT_HISTORY_PAGE_SIZE):
+        """
+        Returns (turns, cursor, has_more): up to `limit` (user_message, bot_response) pairs, oldest first,
+        that come before the `before` cursor (the latest ones when it is None). Pass the returned cursor
+        as `before` to fetch the next older page.
+        """
+        with metrics.span("history_read"), self._connection() as conn:
+            if before is None:
+                rows = conn.execute(SELECT_LATEST_PAGE, (session_id, limit + 1)).fetchall()
+            else:
+                rows = conn.execute(SELECT_PAGE_BEFORE, (session_id, before[0], before[1], limit + 1)).fetchall()
+        has_more = len(rows) > limit
+        rows = rows[:limit][::-1]
+        cursor = (rows[0][1], rows[0][0]) if rows else before
+        return [(user_message, bot_response) for _, _, user_message, bot_response in rows], cursor, has_more
+
+    def close(self):
+        """
+        Closes the idle pooled connections.
+        """
+        while True:
+            try:
+                conn = self._idle.get_nowait()
+            except queue.Empty:
+                break
+            conn.close()
+            with self._pool_lock:
+                self._opened -= 1
+
+# Shared by every session in the process
+chat_history_store = ChatHistoryStore()
+
+def init_chat_db(store=chat_history_store):
+    with store._connection():
+        pass
+
+def save_chat_message(session_id, user_message, bot_response, store=chat_history_store):
+    return store.save_message(session_id, user_message, bot_response)
+
+def get_chat_history(session_id, store=chat_history_store):
+    return store.get_history(session_id)
+
+def get_chat_history_page(session_id, before=None, limit=CHAT_HISTORY_PAGE_SIZE, store=chat_history_store):
+    return store.get_history_page(session_id, before, limit)
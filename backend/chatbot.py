@@ -1,39 +1,161 @@
+import time
+
+from backend.answer_cache import answer_cache, context_key, current_index_version
+from config import ANSWER_CACHE_ENABLED
+from utils.http_client import RequestStats
 from utils.logger import setup_logger
-from utils.llm_handler import query_llm
-from utils.pdf_handler import search_pdf_context
+from utils.metrics import metrics, new_trace_id, trace, trace_id_var
+from utils.llm_handler import query_llm, query_llm_stream
+from utils.pdf_handler import retrieve_pdf_context
 
 logger = setup_logger()
 
-def handle_user_message(user_input, combined_index, combined_sentences, model_name):
+NO_CONTEXT = "No relevant context found in the uploaded documents."
+NO_CONTEXT_RESPONSE = (
+    "I'm sorry, I couldn't find any relevant information in the uploaded documents. "
+    "Could you try rephrasing your question or uploading more documents?"
+)
+ERROR_RESPONSE = (
+    "I'm sorry, something went wrong while processing your request. "
+    "Please try again later or contact support."
+)
+
+_STREAM_END = object()
+
+# Time from receiving a message to its first streamed token, per model
+first_token_stats = RequestStats()
+
+def retrieve_context(user_input, combined_index, combined_sentences):
+    """
+    Retrieves the context for a user message from the FAISS index.
+    Returns (context, query_embedding, ids); the embedding is None when no search was made.
+    """
+    if combined_index is not None and combined_sentences is not None:
+        context, query_embedding, ids = retrieve_pdf_context(user_input, combined_index, combined_sentences)
+        logger.debug("Retrieved context: %s", context)
+        return context, query_embedding, ids
+    logger.warning("No FAISS index or sentences available.")
+    return NO_CONTEXT, None, []
+
+def _answer_cache_key(context, query_embedding, ids, model_name, cache):
+    # Only answers generated from real retrieved context are cacheable
+    if cache is None or query_embedding is None or not ids:
+        return None
+    return query_embedding, model_name, context_key(ids, context), current_index_version()
+
+def _default_cache():
+    return answer_cache if ANSWER_CACHE_ENABLED else None
+
+def handle_user_message(user_input, combined_index, combined_sentences, model_name, cache=None, session_id=None):
     """
     Handles user messages, retrieves context, and generates friendly responses using the Hugging Face Inference API.
+    Answers to similar questions over the same context are served from the semantic answer cache.
     """
-    logger.info(f"Received user input: {user_input}")
+    with trace():
+        logger.info(f"Received user input: {user_input}")
+        start = time.perf_counter()
+        cache = cache or _default_cache()
 
-    # Step 1: Retrieve context using FAISS
-    if combined_index is not None and combined_sentences is not None:
-        context = search_pdf_context(user_input, combined_index, combined_sentences)
-        logger.info(f"Retrieved context: {context}")
-    else:
-        context = "No relevant context found in the uploaded documents."
-        logger.warning("No FAISS index or sentences available.")
+        # Step 1: Retrieve context using FAISS
+        with metrics.span("retrieval"):
+            context, query_embedding, ids = retrieve_context(user_input, combined_index, combined_sentences)
+        cache_key = _answer_cache_key(context, query_embedding, ids, model_name, cache)
+
+        # Step 2: Generate a friendly response using the Hugging Face Inference API
+        try:
+            if context == NO_CONTEXT:
+                response, outcome = NO_CONTEXT_RESPONSE, "no_context"
+            elif cache_key is not None and (cached := _cache_lookup(cache, cache_key)) is not None:
+                response, outcome = cached, "cache_hit"
+            else:
+                # Use the Hugging Face Inference API to generate a response
+                with metrics.span("llm"):
+                    response = query_llm(model_name, user_input, context, session_id=session_id)
+                outcome = "generated"
+                if cache_key is not None and response:
+                    cache.put(*cache_key, response, question=user_input)
+        except Exception as e:
+            logger.error(f"Error generating response with LLM: {e}")
+            response, outcome = ERROR_RESPONSE, "error"
+
+        elapsed = time.perf_counter() - start
+        _record_chat(elapsed, "blocking", outcome)
+        logger.info(f"Generated a {len(response)}-character response in {elapsed:.2f}s ({outcome})")
+        logger.debug("Response: %s", response)
+        return response
 
-    # Step 2: Generate a friendly response using the Hugging Face Inference API
+def handle_user_message_stream(user_input, combined_index, combined_sentences, model_name, cache=None,
+                               session_id=None):
+    """
+    Streaming version of handle_user_message: yields the response in pieces as the LLM generates it.
+    Time to first token is logged and recorded in first_token_stats.
+    """
+    current = trace_id_var.get()
+    trace_id = current if current != "-" else new_trace_id()
+    tokens = _stream_response(user_input, combined_index, combined_sentences, model_name, cache, session_id)
+    # The generator may be resumed from different threads, so every step runs under its own trace()
+    # and the caller's trace id is restored before each token is handed back
     try:
-        if context == "No relevant context found in the uploaded documents.":
-            response = (
-                "I'm sorry, I couldn't find any relevant information in the uploaded documents. "
-                "Could you try rephrasing your question or uploading more documents?"
-            )
+        while True:
+            with trace(trace_id):
+                token = next(tokens, _STREAM_END)
+            if token is _STREAM_END:
+                return
+            yield token
+    finally:
+        with trace(trace_id):
+            tokens.close()
+
+def _stream_response(user_input, combined_index, combined_sentences, model_name, cache, session_id):
+    logger.info(f"Received user input: {user_input}")
+    start = time.perf_counter()
+    cache = cache or _default_cache()
+    first_token_at = None
+    pieces = []
+
+    with metrics.span("retrieval"):
+        context, query_embedding, ids = retrieve_context(user_input, combined_index, combined_sentences)
+    cache_key = _answer_cache_key(context, query_embedding, ids, model_name, cache)
+    generated = False
+    try:
+        if context == NO_CONTEXT:
+            tokens, outcome = [NO_CONTEXT_RESPONSE], "no_context"
+        elif cache_key is not None and (cached := _cache_lookup(cache, cache_key)) is not None:
+            tokens, outcome = [cached], "cache_hit"
         else:
-            # Use the Hugging Face Inference API to generate a response
-            response = query_llm(model_name, user_input, context)
+            tokens, outcome = query_llm_stream(model_name, user_input, context, session_id=session_id), "generated"
+            generated = True
+        for token in tokens:
+            if first_token_at is None:
+                token = token.lstrip()
+                if not token:
+                    continue
+                first_token_at = time.perf_counter() - start
+                first_token_stats.record(model_name, first_token_at)
+                metrics.observe("first_token_seconds", first_token_at, outcome=outcome)
+                logger.info(f"Time to first token: {first_token_at:.2f}s")
+            pieces.append(token)
+            yield token
+        # Only complete generations are cached
+        if generated and cache_key is not None and pieces:
+            cache.put(*cache_key, "".join(pieces), question=user_input)
     except Exception as e:
         logger.error(f"Error generating response with LLM: {e}")
-        response = (
-            "I'm sorry, something went wrong while processing your request. "
-            "Please try again later or contact support."
-        )
+        outcome = "error"
+        # Keep a partial answer rather than replacing what the user has already read
+        if not pieces:
+            pieces.append(ERROR_RESPONSE)
+            yield ERROR_RESPONSE
+
+    elapsed = time.perf_counter() - start
+    _record_chat(elapsed, "stream", outcome)
+    logger.info(f"Generated a {sum(map(len, pieces))}-character response in {elapsed:.2f}s ({outcome})")
+    logger.debug("Response: %s", "".join(pieces))
+
+def _cache_lookup(cache, cache_key):
+    with metrics.span("answer_cache_lookup"):
+        return cache.get(*cache_key)
 
-    logger.info(f"Generated response: {response}")
-    return response
\ No newline at end of file
+def _record_chat(elapsed, mode, outcome):
+    metrics.inc("chat_requests_total", help_text="Chat messages handled, by mode and outcome.", mode=mode, outcome=outcome)
+    metrics.observe("chat_seconds", elapsed, help_text="End-to-end time to answer a chat message.", mode=mode)
@@ -30,10 +30,121 @@ EMBEDDING_MODEL = "all-MiniLM-L6-v2"
 # Paths for PDF processing and FAISS index storage
 PDF_DIRECTORY = "data/pdfs"
 FAISS_INDEX_PATH = "data/training_index.faiss"
-TRAINING_SENTENCES_PATH = "data/training_sentences.npy"
+TRAINING_SENTENCES_PATH = "data/training_sentences.store"
+# Sentences written by older versions of the tools (read only if the store above is missing)
+LEGACY_TRAINING_SENTENCES_PATH = "data/training_sentences.npy"
 
 # Database Path
 DATABASE_PATH = "data/database.db"
+CHAT_HISTORY_DB_PATH = "data/chat_history.db"
+# Chat turns loaded per page on the chat page (older pages load on demand)
+CHAT_HISTORY_PAGE_SIZE = 20
+# SQLite connections kept open for chat history, shared by all threads and Streamlit reruns
+CHAT_HISTORY_POOL_SIZE = 4
 
 # HR Support Email
-HR_EMAIL = "support@nexa.com"
\ No newline at end of file
+HR_EMAIL = "support@nexa.com"
+
+# Query embedding cache (0 disables caching, TTL of None keeps entries until evicted)
+QUERY_EMBEDDING_CACHE_SIZE = 1024
+QUERY_EMBEDDING_CACHE_TTL = None
+
+# Content-addressed cache of extracted sentences and embeddings for uploaded PDFs
+UPLOAD_CACHE_DIR = "data/upload_cache"
+UPLOAD_CACHE_MAX_BYTES = 512 * 1024 * 1024
+
+# Parallel PDF extraction (timeout is per file in seconds; 1 worker and no timeout extracts in-process)
+PDF_EXTRACT_WORKERS = min(4, os.cpu_count() or 1)
+PDF_EXTRACT_TIMEOUT = 60
+PDF_EXTRACT_PAGES_PER_TASK = 8
+
+# Sentences encoded and added to the index per batch when streaming large document sets
+EMBEDDING_BATCH_SIZE = 256
+
+# Sentence cleaning before embedding
+# Lines found on at least this fraction of a document's pages (and on 3+ pages) are treated as headers/footers
+BOILERPLATE_MIN_PAGE_FRACTION = 0.5
+# Merge short consecutive lines into passages of roughly this many characters (0 keeps one line per chunk)
+CHUNK_MERGE_TARGET_CHARS = 0
+
+# FAISS index type built by the tools: "flat", "ivf-flat", "ivf-pq" or "hnsw", with optional
+# parameters, e.g. "ivf-flat:nlist=256,nprobe=16", "ivf-pq:m=16,nbits=8" or "hnsw:m=32,ef_search=64"
+FAISS_INDEX_SPEC = "flat"
+# Vectors sampled to train IVF/PQ indices
+FAISS_TRAIN_SAMPLE_SIZE = 50000
+
+# Memory-map the pre-trained index and sentences read-only instead of loading them into each process
+INDEX_LOAD_MMAP = True
+
+# Shared HTTP client settings for Hugging Face API calls (timeouts in seconds)
+HTTP_POOL_SIZE = 16
+HTTP_CONNECT_TIMEOUT = 5
+HTTP_READ_TIMEOUT = 60
+HTTP_MAX_RETRIES = 4
+HTTP_BACKOFF_BASE = 1.0
+# Longest single wait between retries, even if the API's estimated_time asks for more
+HTTP_MAX_BACKOFF = 30
+# Total time a chat request may spend on attempts and waits before giving up
+LLM_REQUEST_DEADLINE = 45
+# Stream chat responses token by token (server-sent events) instead of waiting for the full generation
+LLM_STREAMING = True
+# At most this many LLM requests run at once per process; waiting requests are served fairly per session
+LLM_MAX_CONCURRENT_REQUESTS = 4
+LLM_QUEUE_TIMEOUT = 30
+
+# Offline summarization in the index builder
+SUMMARIZATION_API_URL = f"https://api-inference.huggingface.co/models/{SUMMARIZATION_MODEL}"
+SUMMARIZATION_CONCURRENCY = 4
+SUMMARIZATION_BATCH_SIZE = 4
+
+# Manifest and summary cache used for incremental index rebuilds
+INDEX_BUILD_CACHE_DIR = "data/index_build_cache"
+
+# Semantic answer cache in front of the LLM: a question whose embedding is within this cosine
+# similarity of a cached one, with the same retrieved context and model, reuses the cached answer
+ANSWER_CACHE_ENABLED = True
+ANSWER_CACHE_PATH = "data/answer_cache.db"
+ANSWER_CACHE_SIMILARITY = 0.95
+ANSWER_CACHE_TTL = 7 * 24 * 3600  # seconds; None keeps answers until evicted by size
+ANSWER_CACHE_MAX_ENTRIES = 5000
+
+# Standalone chat API service (backend/api_server.py)
+CHAT_API_HOST = "127.0.0.1"
+CHAT_API_PORT = 8000
+CHAT_API_WORKERS = 2
+CHAT_API_THREADS = 8  # Threads per worker for encoding, FAISS search and LLM calls
+# When set (e.g. "http://127.0.0.1:8000"), the Streamlit app sends chat messages to this service
+# instead of answering them in-process. Uploaded documents are only searched in-process.
+CHAT_API_URL = None
+# Models clients of the service may ask for besides LLM_MODEL_URL. The Hugging Face API key is sent
+# with every LLM call, so only list endpoints you trust (e.g. add "http://127.0.0.1:8089/" for load tests).
+CHAT_API_MODELS = [
+    "mistralai/Mistral-7B-Instruct-v0.1",
+    "tiiuae/falcon-7b-instruct",
+    "gpt2",
+    "google/flan-t5-large",
+]
+
+# Micro-batching of query encoding and FAISS searches across concurrent requests. A lone request is
+# processed at once. Under concurrent load a batch waits up to MICRO_BATCH_MAX_WAIT_MS (or until
+# MICRO_BATCH_MAX_SIZE requests are pending) for more requests: each request may pay up to that wait
+# twice (encoding and search) in exchange for fewer, larger model and index calls
+MICRO_BATCH_ENABLED = True
+MICRO_BATCH_MAX_SIZE = 32
+MICRO_BATCH_MAX_WAIT_MS = 2
+
+# Serve per-stage latency metrics in Prometheus text format at http://127.0.0.1:<port>/metrics
+# from the Streamlit app process (None disables it; the chat API always serves /metrics)
+METRICS_PORT = None
+
+# Logging: records are written by a background thread to LOG_DIR/<name>.log, which rotates by size
+# (or by time when LOG_ROTATE_WHEN is set, e.g. "midnight"); messages longer than
+# LOG_MAX_MESSAGE_CHARS are truncated and records are dropped if LOG_QUEUE_SIZE are pending
+LOG_DIR = "logs"
+LOG_LEVEL = "INFO"
+LOG_JSON = False
+LOG_MAX_BYTES = 10 * 1024 * 1024
+LOG_BACKUP_COUNT = 5
+LOG_ROTATE_WHEN = None
+LOG_QUEUE_SIZE = 10000
+LOG_MAX_MESSAGE_CHARS = 2000
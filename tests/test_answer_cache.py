@@ -0,0 +1,115 @@
+import numpy as np
+import pytest
+
+from backend import answer_cache as answer_cache_module
+from backend.answer_cache import AnswerCache, context_key
+
+MODEL = "mistralai/Mistral-7B-Instruct-v0.1"
+CONTEXT = context_key([3, 7], "Employees get 15 days of vacation leave per year.")
+VERSION = "index-v1"
+
+# Unit vectors with known cosine similarities to QUESTION
+QUESTION = np.array([1.0, 0.0, 0.0], dtype="float32")
+CLOSE = np.array([0.98, 0.199, 0.0], dtype="float32")  # ~0.98
+FAR = np.array([0.8, 0.6, 0.0], dtype="float32")  # 0.8
+OTHER = np.array([0.0, 0.0, 1.0], dtype="float32")
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [1_000_000.0]
+    monkeypatch.setattr(answer_cache_module.time, "time", lambda: now[0])
+    return now
+
+def new_cache(tmp_path, **kwargs):
+    return AnswerCache(db_path=str(tmp_path / "answer_cache.db"), **kwargs)
+
+def test_similar_question_hits_and_dissimilar_misses(tmp_path):
+    cache = new_cache(tmp_path, threshold=0.95)
+    cache.put(QUESTION, MODEL, CONTEXT, VERSION, "15 days.")
+
+    assert cache.get(QUESTION * 3, MODEL, CONTEXT, VERSION) == "15 days."
+    assert cache.get(CLOSE, MODEL, CONTEXT, VERSION) == "15 days."
+    assert cache.get(FAR, MODEL, CONTEXT, VERSION) is None
+    assert cache.get(OTHER, MODEL, CONTEXT, VERSION) is None
+    stats = cache.stats()
+    assert (stats["hits"], stats["misses"]) == (2, 2)
+
+def test_threshold_is_configurable(tmp_path):
+    cache = new_cache(tmp_path, threshold=0.75)
+    cache.put(QUESTION, MODEL, CONTEXT, VERSION, "15 days.")
+    assert cache.get(FAR, MODEL, CONTEXT, VERSION) == "15 days."
+
+def test_best_match_wins(tmp_path):
+    cache = new_cache(tmp_path, threshold=0.75)
+    cache.put(FAR, MODEL, CONTEXT, VERSION, "far")
+    cache.put(CLOSE, MODEL, CONTEXT, VERSION, "close")
+    assert cache.get(QUESTION, MODEL, CONTEXT, VERSION) == "close"
+
+def test_model_and_context_must_match(tmp_path):
+    cache = new_cache(tmp_path)
+    cache.put(QUESTION, MODEL, CONTEXT, VERSION, "15 days.")
+
+    assert cache.get(QUESTION, "gpt2", CONTEXT, VERSION) is None
+    # Same sentence ids with different text (e.g. another session's upload), and the other way round
+    assert cache.get(QUESTION, MODEL, context_key([3, 7], "Employees get 20 days of leave."), VERSION) is None
+    assert cache.get(QUESTION, MODEL, context_key([3, 8], "Employees get 15 days of vacation leave per year."), VERSION) is None
+    assert cache.get(QUESTION, MODEL, CONTEXT, VERSION) == "15 days."
+
+def test_entries_expire_after_ttl(tmp_path, clock):
+    cache = new_cache(tmp_path, ttl=60)
+    cache.put(QUESTION, MODEL, CONTEXT, VERSION, "15 days.")
+
+    clock[0] += 60
+    assert cache.get(QUESTION, MODEL, CONTEXT, VERSION) == "15 days."
+    clock[0] += 1
+    assert cache.get(QUESTION, MODEL, CONTEXT, VERSION) is None
+    stats = cache.stats()
+    assert (stats["size"], stats["evictions"]) == (0, 1)
+
+def test_least_recently_used_entries_are_evicted(tmp_path, clock):
+    cache = new_cache(tmp_path, max_entries=2)
+    cache.put(QUESTION, MODEL, CONTEXT, VERSION, "first")
+    clock[0] += 1
+    cache.put(OTHER, MODEL, CONTEXT, VERSION, "second")
+    clock[0] += 1
+    # Reading the first entry makes the second one the least recently used
+    assert cache.get(QUESTION, MODEL, CONTEXT, VERSION) == "first"
+    clock[0] += 1
+    cache.put(FAR, "gpt2", CONTEXT, VERSION, "third")
+
+    assert cache.get(OTHER, MODEL, CONTEXT, VERSION) is None
+    assert cache.get(QUESTION, MODEL, CONTEXT, VERSION) == "first"
+    assert cache.get(FAR, "gpt2", CONTEXT, VERSION) == "third"
+    stats = cache.stats()
+    assert (stats["size"], stats["evictions"]) == (2, 1)
+
+def test_index_version_change_drops_everything(tmp_path):
+    cache = new_cache(tmp_path)
+    cache.put(QUESTION, MODEL, CONTEXT, VERSION, "15 days.")
+    cache.put(OTHER, MODEL, CONTEXT, VERSION, "Last working day.")
+
+    assert cache.get(QUESTION, MODEL, CONTEXT, "index-v2") is None
+    assert cache.stats()["size"] == 0
+    # Entries of the old version are gone from disk too
+    assert new_cache(tmp_path).get(QUESTION, MODEL, CONTEXT, VERSION) is None
+
+def test_entries_are_reloaded_after_restart(tmp_path, clock):
+    cache = new_cache(tmp_path, max_entries=2)
+    cache.put(QUESTION, MODEL, CONTEXT, VERSION, "first", question="How many leave days do I get?")
+    clock[0] += 1
+    cache.put(OTHER, MODEL, CONTEXT, VERSION, "second")
+    clock[0] += 1
+    cache.get(QUESTION, MODEL, CONTEXT, VERSION)
+
+    restarted = new_cache(tmp_path, max_entries=2)
+    clock[0] += 1
+    # Last-use times survive the restart, so "second" is still the one evicted
+    restarted.put(FAR, "gpt2", CONTEXT, VERSION, "third")
+    assert restarted.get(OTHER, MODEL, CONTEXT, VERSION) is None
+    assert restarted.get(CLOSE, MODEL, CONTEXT, VERSION) == "first"
+    assert restarted.get(FAR, "gpt2", CONTEXT, VERSION) == "third"
+
+def test_reloaded_entries_still_expire(tmp_path, clock):
+    new_cache(tmp_path, ttl=60).put(QUESTION, MODEL, CONTEXT, VERSION, "15 days.")
+    clock[0] += 61
+    assert new_cache(tmp_path, ttl=60).get(QUESTION, MODEL, CONTEXT, VERSION) is None
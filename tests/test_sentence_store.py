@@ -0,0 +1,120 @@
+import hashlib
+
+import numpy as np
+import pytest
+
+from utils.sentence_store import HEADER, STORE_MAGIC, STORE_VERSION, SentenceStore, load_sentences, save_sentences
+
+SENTENCES = [
+    "Employees get 15 days of vacation leave per year.",
+    "",
+    "Salaries are paid on the last working day of the month.",
+    "Up to 5 unused vacation days carry over.",
+]
+NON_ASCII = [
+    "Überstunden werden mit 125 % vergütet.",
+    "Congé de maternité : 26 semaines",
+    "有給休暇は年15日です。",
+    "Leave approved ✅ — enjoy 🌴",
+]
+
+def file_digest(path):
+    return hashlib.sha256(path.read_bytes()).hexdigest()
+
+@pytest.mark.parametrize("mmap", [True, False])
+def test_round_trip(tmp_path, mmap):
+    path = tmp_path / "sentences.store"
+    SentenceStore.from_iterable(SENTENCES).save(path)
+
+    store = SentenceStore.load(path, mmap=mmap)
+    assert len(store) == len(SENTENCES)
+    assert list(store) == SENTENCES
+    assert store[2] == SENTENCES[2]
+    assert store[-1] == SENTENCES[-1]
+    with pytest.raises(IndexError):
+        store[len(SENTENCES)]
+
+@pytest.mark.parametrize("mmap", [True, False])
+def test_empty_store_round_trip(tmp_path, mmap):
+    path = tmp_path / "empty.store"
+    SentenceStore().save(path)
+    assert len(SentenceStore.load(path, mmap=mmap)) == 0
+
+@pytest.mark.parametrize("mmap", [True, False])
+def test_non_ascii_round_trip(tmp_path, mmap):
+    path = tmp_path / "sentences.store"
+    save_sentences(path, NON_ASCII)
+    assert list(SentenceStore.load(path, mmap=mmap)) == NON_ASCII
+
+def test_append_on_mapped_store(tmp_path):
+    path = tmp_path / "sentences.store"
+    save_sentences(path, SENTENCES)
+    digest = file_digest(path)
+
+    store = SentenceStore.load(path, mmap=True)
+    store.extend(NON_ASCII)
+    store.append("Last one")
+    assert len(store) == len(SENTENCES) + len(NON_ASCII) + 1
+    assert list(store) == SENTENCES + NON_ASCII + ["Last one"]
+    # Appends live in the tail: the mapped file is untouched
+    assert file_digest(path) == digest
+
+    merged_path = tmp_path / "merged.store"
+    store.save(merged_path)
+    assert list(SentenceStore.load(merged_path, mmap=True)) == SENTENCES + NON_ASCII + ["Last one"]
+
+def test_save_over_mapped_file(tmp_path):
+    path = tmp_path / "sentences.store"
+    save_sentences(path, SENTENCES)
+    store = SentenceStore.load(path, mmap=True)
+    store.append("Added later")
+
+    # The file is replaced atomically, so the mapping being read stays valid
+    store.save(path)
+    assert list(SentenceStore.load(path, mmap=False)) == SENTENCES + ["Added later"]
+
+def test_bad_magic_is_rejected(tmp_path):
+    path = tmp_path / "bad.store"
+    path.write_bytes(HEADER.pack(b"XXXX", STORE_VERSION, 0, 0) + np.zeros(1, dtype="<u8").tobytes())
+    with pytest.raises(ValueError, match="is not a sentence store"):
+        SentenceStore.load(path)
+
+def test_unknown_version_is_rejected(tmp_path):
+    path = tmp_path / "future.store"
+    path.write_bytes(HEADER.pack(STORE_MAGIC, STORE_VERSION + 1, 0, 0) + np.zeros(1, dtype="<u8").tobytes())
+    with pytest.raises(ValueError, match=f"version {STORE_VERSION + 1}"):
+        SentenceStore.load(path)
+
+def test_truncated_file_is_rejected(tmp_path):
+    path = tmp_path / "short.store"
+    path.write_bytes(STORE_MAGIC)
+    with pytest.raises(ValueError, match="too short"):
+        SentenceStore.load(path)
+
+@pytest.mark.parametrize("mmap", [True, False])
+@pytest.mark.parametrize("keep", [-1, HEADER.size + 4])
+def test_file_truncated_after_header_is_rejected(tmp_path, mmap, keep):
+    # Cut inside the sentence bytes, or inside the offsets table
+    path = tmp_path / "sentences.store"
+    save_sentences(path, SENTENCES)
+    path.write_bytes(path.read_bytes()[:keep])
+    with pytest.raises(ValueError, match="is truncated"):
+        SentenceStore.load(path, mmap=mmap)
+
+def test_inconsistent_offsets_are_rejected(tmp_path):
+    path = tmp_path / "sentences.store"
+    save_sentences(path, SENTENCES)
+    data = bytearray(path.read_bytes())
+    _, _, count, buffer_length = HEADER.unpack_from(data)
+    # Point the last offset past the end of the buffer
+    offsets_end = HEADER.size + 8 * (count + 1)
+    data[offsets_end - 8:offsets_end] = np.array([buffer_length + 10], dtype="<u8").tobytes()
+    path.write_bytes(bytes(data))
+    with pytest.raises(ValueError, match="is corrupt"):
+        SentenceStore.load(path)
+
+@pytest.mark.parametrize("mmap", [True, False])
+def test_load_sentences_reads_legacy_npy(tmp_path, mmap):
+    path = tmp_path / "training_sentences.npy"
+    np.save(path, np.array(SENTENCES))
+    assert list(load_sentences(path, mmap=mmap)) == SENTENCES
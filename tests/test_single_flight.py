@@ -0,0 +1,132 @@
+import threading
+import time
+
+import pytest
+
+from utils.single_flight import FairLimiter, SingleFlight
+
+def wait_until(condition, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        if time.monotonic() > deadline:
+            raise AssertionError("condition not reached in time")
+        time.sleep(0.001)
+
+def run_threads(targets):
+    threads = [threading.Thread(target=target) for target in targets]
+    for thread in threads:
+        thread.start()
+    return threads
+
+def test_single_flight_shares_one_execution():
+    flights = SingleFlight()
+    release = threading.Event()
+    executions = []
+    results = []
+
+    def fn():
+        executions.append(1)
+        release.wait(5)
+        return object()
+
+    threads = run_threads([lambda: results.append(flights.do("key", fn)) for _ in range(8)])
+    wait_until(lambda: flights.stats()["coalesced"] == 7)
+    release.set()
+    for thread in threads:
+        thread.join()
+
+    assert len(executions) == 1
+    assert len(results) == 8
+    assert all(result is results[0] for result in results)
+    assert flights.stats() == {"in_flight": 0, "calls": 1, "coalesced": 7}
+
+def test_single_flight_shares_the_exception():
+    flights = SingleFlight()
+    release = threading.Event()
+    error = ValueError("upstream failed")
+    raised = []
+
+    def fn():
+        release.wait(5)
+        raise error
+
+    def call():
+        try:
+            flights.do("key", fn)
+        except ValueError as e:
+            raised.append(e)
+
+    threads = run_threads([call for _ in range(5)])
+    wait_until(lambda: flights.stats()["coalesced"] == 4)
+    release.set()
+    for thread in threads:
+        thread.join()
+
+    assert len(raised) == 5
+    assert all(e is error for e in raised)
+    # A failed call is not remembered: the next caller runs the function again
+    assert flights.do("key", lambda: "retried") == "retried"
+
+def test_single_flight_keys_run_independently():
+    flights = SingleFlight()
+    assert flights.do("a", lambda: 1) == 1
+    assert flights.do("b", lambda: 2) == 2
+    assert flights.stats()["calls"] == 2
+
+def test_fair_limiter_grants_sessions_round_robin():
+    limiter = FairLimiter(max_concurrent=1)
+    limiter.acquire("holder")
+    order = []
+
+    def worker(name, session):
+        with limiter.slot(session):
+            order.append(name)
+
+    # Session A queues three requests before session B queues two
+    threads = []
+    for name, session in [("A0", "A"), ("A1", "A"), ("A2", "A"), ("B0", "B"), ("B1", "B")]:
+        threads += run_threads([lambda name=name, session=session: worker(name, session)])
+        wait_until(lambda count=len(threads): limiter.stats()["waiting"] == count)
+
+    limiter.release()
+    for thread in threads:
+        thread.join()
+
+    assert order == ["A0", "B0", "A1", "B1", "A2"]
+    assert limiter.stats()["active"] == 0
+
+def test_fair_limiter_removes_timed_out_waiter():
+    limiter = FairLimiter(max_concurrent=1)
+    limiter.acquire("holder")
+
+    with pytest.raises(TimeoutError):
+        limiter.acquire("late", timeout=0.05)
+
+    stats = limiter.stats()
+    assert stats["waiting"] == 0
+    assert stats["waiting_sessions"] == 0
+
+    # The abandoned ticket must not be granted the slot when it frees up
+    limiter.release()
+    limiter.acquire("next", timeout=1)
+    assert limiter.stats()["active"] == 1
+
+def test_fair_limiter_timeout_keeps_other_waiters():
+    limiter = FairLimiter(max_concurrent=1)
+    limiter.acquire("holder")
+    granted = threading.Event()
+
+    def waiter():
+        with limiter.slot("patient", timeout=5):
+            granted.set()
+
+    thread = run_threads([waiter])[0]
+    wait_until(lambda: limiter.stats()["waiting"] == 1)
+    with pytest.raises(TimeoutError):
+        limiter.acquire("late", timeout=0.05)
+
+    limiter.release()
+    thread.join()
+    assert granted.is_set()
+    stats = limiter.stats()
+    assert (stats["active"], stats["waiting"], stats["waiting_sessions"]) == (0, 0, 0)
@@ -0,0 +1,104 @@
+import argparse
+import os
+import sys
+import time
+
+import faiss
+import numpy as np
+
+# Add the root directory to the Python path
+ROOT_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+sys.path.append(ROOT_DIR)
+
+from config import FAISS_INDEX_PATH, FAISS_TRAIN_SAMPLE_SIZE
+from utils.index_builder import build_index, describe_index
+
+DEFAULT_SPECS = ["flat", "ivf-flat", "ivf-pq", "hnsw"]
+
+def load_corpus_vectors(index_path, synthetic=0, dimension=384, seed=0):
+    """
+    Returns the vectors to benchmark: either reconstructed from a saved flat index,
+    or `synthetic` random unit vectors when requested.
+    """
+    if synthetic:
+        vectors = np.random.default_rng(seed).standard_normal((synthetic, dimension)).astype("float32")
+        faiss.normalize_L2(vectors)
+        return vectors
+    index = faiss.read_index(index_path)
+    return index.reconstruct_n(0, index.ntotal)
+
+def make_queries(vectors, num_queries, noise=0.05, seed=1):
+    """
+    Builds queries by perturbing randomly chosen corpus vectors, which resembles paraphrased questions.
+    """
+    rng = np.random.default_rng(seed)
+    rows = rng.choice(len(vectors), min(num_queries, len(vectors)), replace=False)
+    queries = vectors[rows] + noise * rng.standard_normal((len(rows), vectors.shape[1])).astype("float32")
+    return np.ascontiguousarray(queries, dtype="float32")
+
+def recall_at_k(vectors, queries, ground_truth_distances, results):
+    """
+    Fraction of returned neighbours that are within the exact k-th nearest distance.
+    Comparing distances rather than ids keeps duplicate sentences from counting as misses.
+    """
+    hits = 0
+    for query, kth_distance, found in zip(queries, ground_truth_distances[:, -1], results):
+        found = found[found >= 0]
+        distances = ((vectors[found] - query) ** 2).sum(axis=1)
+        hits += int((distances <= kth_distance * (1 + 1e-5) + 1e-6).sum())
+    return hits / ground_truth_distances.size
+
+def time_queries(index, queries, k):
+    """
+    Searches one query at a time, like the chat path does, and returns (ids, latencies in ms).
+    """
+    ids = np.empty((len(queries), k), dtype="int64")
+    latencies = []
+    for row, query in enumerate(queries):
+        start = time.perf_counter()
+        _, found = index.search(query.reshape(1, -1), k)
+        latencies.append((time.perf_counter() - start) * 1000)
+        ids[row] = found[0]
+    return ids, np.array(latencies)
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Compare recall, latency and size of FAISS index types.")
+    parser.add_argument("--index-path", default=FAISS_INDEX_PATH, help="Flat index whose vectors form the corpus.")
+    parser.add_argument("--synthetic", type=int, default=0, help="Benchmark N random vectors instead of the saved index.")
+    parser.add_argument("--specs", nargs="+", default=DEFAULT_SPECS, help="Index specs to compare.")
+    parser.add_argument("--queries", type=int, default=500, help="Number of queries to run.")
+    parser.add_argument("--k", type=int, default=3, help="Neighbours per query (the chat path uses 3).")
+    parser.add_argument("--sample-size", type=int, default=FAISS_TRAIN_SAMPLE_SIZE, help="Training sample size.")
+    return parser.parse_args()
+
+def main():
+    args = parse_args()
+    vectors = load_corpus_vectors(args.index_path, args.synthetic)
+    queries = make_queries(vectors, args.queries)
+    print(f"Corpus: {len(vectors)} vectors of dimension {vectors.shape[1]}, {len(queries)} queries, k={args.k}")
+
+    exact = faiss.IndexFlatL2(vectors.shape[1])
+    exact.add(vectors)
+    ground_truth_distances, _ = exact.search(queries, args.k)
+
+    print(f"{'spec':<32}{'recall@k':>10}{'p50 ms':>10}{'p99 ms':>10}{'build s':>10}{'size MiB':>10}")
+    for spec in args.specs:
+        try:
+            start = time.perf_counter()
+            index = build_index(vectors, spec, sample_size=args.sample_size)
+            build_seconds = time.perf_counter() - start
+        except ValueError as e:
+            print(f"{spec:<32} skipped: {e}")
+            continue
+
+        found, latencies = time_queries(index, queries, args.k)
+        size_mib = faiss.serialize_index(index).size / (1024 * 1024)
+        print(
+            f"{spec:<32}{recall_at_k(vectors, queries, ground_truth_distances, found):>10.3f}"
+            f"{np.percentile(latencies, 50):>10.3f}{np.percentile(latencies, 99):>10.3f}"
+            f"{build_seconds:>10.2f}{size_mib:>10.2f}"
+        )
+        print(f"{'':<32}{describe_index(index)}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,312 @@
+import argparse
+import gc
+import glob
+import json
+import os
+import platform
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+from importlib import metadata
+
+# The suite runs offline: the embedding model must already be in the local Hugging Face cache
+os.environ.setdefault("HF_HUB_OFFLINE", "1")
+os.environ.setdefault("TRANSFORMERS_OFFLINE", "1")
+
+import faiss
+import numpy as np
+import PyPDF2
+
+# Add the root directory to the Python path
+ROOT_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+sys.path.append(ROOT_DIR)
+
+from config import EMBEDDING_MODEL, MICRO_BATCH_ENABLED, PDF_DIRECTORY
+from backend.chat_history import ChatHistoryStore
+from utils.embedding_model import encode
+from utils.pdf_handler import combine_indices, create_pdf_embeddings, extract_text_from_pdf, search_pdf_context
+
+BENCHMARKS = [
+    "extract_text_from_pdf",
+    "create_pdf_embeddings",
+    "combine_indices",
+    "search_pdf_context",
+    "history_save_message",
+    "history_get_history",
+    "history_get_history_page",
+]
+VERSIONED_PACKAGES = ["faiss-cpu", "numpy", "PyPDF2", "sentence-transformers", "torch", "nltk"]
+
+# Building blocks of the synthetic HR corpus
+TOPICS = [
+    "annual leave", "sick leave", "parental leave", "overtime pay", "payroll", "health insurance",
+    "remote work", "travel expenses", "performance reviews", "probation", "notice period", "training budget",
+]
+GROUPS = ["Full-time employees", "Part-time employees", "Contractors", "Managers", "New hires", "Interns"]
+RULES = [
+    "are entitled to {n} days of {topic} per calendar year.",
+    "must submit {topic} requests at least {n} working days in advance.",
+    "receive {topic} reimbursement within {n} days of approval.",
+    "should contact HR about {topic} no later than {n} days before the deadline.",
+    "can carry over up to {n} days of unused {topic} to the next year.",
+    "are reviewed for {topic} eligibility after {n} months of service.",
+]
+QUESTIONS = [
+    "How many days of {topic} do {group} get?",
+    "What is the policy on {topic} for {group}?",
+    "When are {group} paid for {topic}?",
+    "Who approves {topic} for {group}?",
+]
+
+def synthetic_hr_corpus(num_sentences, seed=0):
+    """
+    Generates policy-style sentences that resemble the HR handbook, deterministically for a given seed.
+    """
+    rng = np.random.default_rng(seed)
+    sentences = []
+    for number in range(num_sentences):
+        rule = RULES[rng.integers(len(RULES))].format(
+            n=int(rng.integers(1, 31)), topic=TOPICS[rng.integers(len(TOPICS))]
+        )
+        # The section number keeps sentences unique, like numbered clauses in a handbook
+        sentences.append(f"Section {number + 1}: {GROUPS[rng.integers(len(GROUPS))]} {rule}")
+    return sentences
+
+def synthetic_queries(num_queries, seed=1):
+    """
+    Generates distinct employee questions, so the query embedding cache never answers them.
+    """
+    rng = np.random.default_rng(seed)
+    return [
+        QUESTIONS[rng.integers(len(QUESTIONS))].format(
+            topic=TOPICS[rng.integers(len(TOPICS))], group=GROUPS[rng.integers(len(GROUPS))].lower()
+        ) + f" (ticket {number})"
+        for number in range(num_queries)
+    ]
+
+def _reset_peak_rss():
+    # Linux lets a process reset its VmHWM high-water mark, so each benchmark reports its own peak
+    try:
+        with open("/proc/self/clear_refs", "w") as clear_refs:
+            clear_refs.write("5")
+    except OSError:
+        pass
+
+def _peak_rss_bytes():
+    try:
+        with open("/proc/self/status", "r") as status:
+            for line in status:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1]) * 1024
+    except (OSError, ValueError, IndexError):
+        pass
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is reported in kilobytes on Linux and bytes on macOS
+    return peak if platform.system() == "Darwin" else peak * 1024
+
+def run_benchmark(name, calls, unit, warmup=1):
+    """
+    Times each (function, items) pair in calls and summarizes them as throughput (items per second),
+    p50/p99 latency per call and the peak RSS of the process while the benchmark ran.
+    The first `warmup` calls are run but not timed.
+    """
+    for fn, _ in calls[:warmup]:
+        fn()
+    gc.collect()
+    _reset_peak_rss()
+
+    latencies = []
+    total_items = 0
+    for fn, items in calls[warmup:]:
+        start = time.perf_counter()
+        fn()
+        latencies.append(time.perf_counter() - start)
+        total_items += items
+
+    latencies_ms = np.array(latencies) * 1000
+    result = {
+        "name": name,
+        "calls": len(latencies),
+        "unit": unit,
+        "items": total_items,
+        "throughput": total_items / sum(latencies) if sum(latencies) else 0.0,
+        "p50_ms": float(np.percentile(latencies_ms, 50)),
+        "p99_ms": float(np.percentile(latencies_ms, 99)),
+        "mean_ms": float(latencies_ms.mean()),
+        "peak_rss_mib": _peak_rss_bytes() / (1024 * 1024),
+    }
+    print(
+        f"{name:<28}{result['throughput']:>12.1f} {unit + '/s':<14}{result['p50_ms']:>10.3f}"
+        f"{result['p99_ms']:>10.3f}{result['peak_rss_mib']:>12.1f}"
+    )
+    return result
+
+def bench_extract(pdf_dir, rounds):
+    paths = sorted(glob.glob(os.path.join(pdf_dir, "*.pdf")))
+    if not paths:
+        print(f"{'extract_text_from_pdf':<28} skipped: no PDFs in {pdf_dir}")
+        return None
+    calls = []
+    for path in paths:
+        with open(path, "rb") as file:
+            pages = len(PyPDF2.PdfReader(file).pages)
+        calls.append((lambda path=path: extract_text_from_pdf(path), pages))
+    return run_benchmark("extract_text_from_pdf", calls * rounds, "pages")
+
+def bench_history(num_sessions, turns_per_session, page_size):
+    results = []
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        store = ChatHistoryStore(os.path.join(tmp_dir, "chat_history.db"))
+        store.save_message("warmup", "", "")
+        sessions = [f"session-{number}" for number in range(num_sessions)]
+        answer = "Full-time employees are entitled to 20 days of annual leave per calendar year. " * 4
+
+        saves = [
+            (lambda session=session, turn=turn: store.save_message(session, f"Question {turn}?", answer), 1)
+            for turn in range(turns_per_session) for session in sessions
+        ]
+        results.append(run_benchmark("history_save_message", saves, "rows", warmup=0))
+        results.append(run_benchmark(
+            "history_get_history",
+            [(lambda session=session: store.get_history(session), turns_per_session) for session in sessions],
+            "rows",
+        ))
+        results.append(run_benchmark(
+            "history_get_history_page",
+            [(lambda session=session: store.get_history_page(session, limit=page_size), page_size) for session in sessions],
+            "rows",
+        ))
+        store.close()
+    return results
+
+def git_commit():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "HEAD"], cwd=ROOT_DIR, capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def package_versions():
+    versions = {}
+    for package in VERSIONED_PACKAGES:
+        try:
+            versions[package] = metadata.version(package)
+        except metadata.PackageNotFoundError:
+            versions[package] = None
+    return versions
+
+def compare(results, baseline_path):
+    """
+    Prints the change of every benchmark against a previously saved result file.
+    """
+    with open(baseline_path, "r", encoding="utf-8") as file:
+        baseline = {result["name"]: result for result in json.load(file)["results"]}
+    print(f"\nCompared with {baseline_path}:")
+    print(f"{'benchmark':<28}{'throughput':>12}{'p50':>10}{'p99':>10}{'peak RSS':>12}")
+    for result in results:
+        old = baseline.get(result["name"])
+        if old is None:
+            print(f"{result['name']:<28} not in baseline")
+            continue
+        changes = [
+            (result[key] / old[key] - 1) * 100 if old[key] else 0.0
+            for key in ("throughput", "p50_ms", "p99_ms", "peak_rss_mib")
+        ]
+        print(f"{result['name']:<28}{changes[0]:>+11.1f}%{changes[1]:>+9.1f}%{changes[2]:>+9.1f}%{changes[3]:>+11.1f}%")
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Benchmark the retrieval, ingest and chat history hot paths.")
+    parser.add_argument("--only", nargs="+", choices=BENCHMARKS, help="Run only these benchmarks.")
+    parser.add_argument("--pdf-dir", default=os.path.join(ROOT_DIR, PDF_DIRECTORY), help="PDFs used by extract_text_from_pdf.")
+    parser.add_argument("--pdf-rounds", type=int, default=3, help="Times each PDF is extracted.")
+    parser.add_argument("--corpus-size", type=int, default=5000, help="Sentences in the synthetic pre-trained index.")
+    parser.add_argument("--upload-size", type=int, default=500, help="Lines in each synthetic uploaded document.")
+    parser.add_argument("--embed-rounds", type=int, default=3, help="Calls to create_pdf_embeddings.")
+    parser.add_argument("--combine-rounds", type=int, default=50, help="Calls to combine_indices.")
+    parser.add_argument("--queries", type=int, default=200, help="Distinct queries for search_pdf_context.")
+    parser.add_argument("--top-k", type=int, default=3, help="Sentences retrieved per query.")
+    parser.add_argument("--sessions", type=int, default=20, help="Chat sessions written to the history store.")
+    parser.add_argument("--turns", type=int, default=50, help="Turns written per session.")
+    parser.add_argument("--page-size", type=int, default=20, help="Turns per history page.")
+    parser.add_argument("--seed", type=int, default=0, help="Seed of the synthetic corpus.")
+    parser.add_argument("--output", default="benchmark_results.json", help="Where to save the JSON results.")
+    parser.add_argument("--compare", help="Earlier result file to compare against.")
+    return parser.parse_args()
+
+def main():
+    args = parse_args()
+    selected = set(args.only or BENCHMARKS)
+    results = []
+
+    print(f"{'benchmark':<28}{'throughput':>12} {'':<14}{'p50 ms':>10}{'p99 ms':>10}{'peak MiB':>12}")
+    if "extract_text_from_pdf" in selected:
+        results.append(bench_extract(args.pdf_dir, args.pdf_rounds))
+
+    if selected & {"create_pdf_embeddings", "combine_indices", "search_pdf_context"}:
+        corpus = synthetic_hr_corpus(args.corpus_size, seed=args.seed)
+        uploads = [
+            synthetic_hr_corpus(args.upload_size, seed=args.seed + 1 + number)
+            for number in range(max(args.embed_rounds, 1) + 1)
+        ]
+
+        if "create_pdf_embeddings" in selected:
+            results.append(run_benchmark(
+                "create_pdf_embeddings",
+                [(lambda lines=lines: create_pdf_embeddings("\n".join(lines)), len(lines)) for lines in uploads],
+                "lines",
+            ))
+
+        # The pre-trained index is a flat index over the embedded synthetic corpus, like save_data_to_faiss.py builds
+        user_sentences, user_embeddings = create_pdf_embeddings(uploads[0])
+        corpus_embeddings = encode(corpus)
+        pretrained_index = faiss.IndexFlatL2(corpus_embeddings.shape[1])
+        pretrained_index.add(corpus_embeddings)
+
+        if "combine_indices" in selected:
+            results.append(run_benchmark(
+                "combine_indices",
+                [
+                    (lambda: combine_indices(pretrained_index, corpus, user_embeddings, user_sentences), len(user_sentences))
+                ] * (args.combine_rounds + 1),
+                "vectors",
+            ))
+
+        if "search_pdf_context" in selected:
+            combined_index, combined_sentences = combine_indices(pretrained_index, corpus, user_embeddings, user_sentences)
+            results.append(run_benchmark(
+                "search_pdf_context",
+                [
+                    (lambda query=query: search_pdf_context(query, combined_index, combined_sentences, args.top_k), 1)
+                    for query in synthetic_queries(args.queries + 1, seed=args.seed + 1)
+                ],
+                "queries",
+            ))
+
+    if selected & {"history_save_message", "history_get_history", "history_get_history_page"}:
+        results.extend(
+            result for result in bench_history(args.sessions, args.turns, args.page_size) if result["name"] in selected
+        )
+
+    results = [result for result in results if result is not None]
+    report = {
+        "commit": git_commit(),
+        "created_at": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "packages": package_versions(),
+        "settings": {**vars(args), "embedding_model": EMBEDDING_MODEL, "micro_batch_enabled": MICRO_BATCH_ENABLED},
+        "results": results,
+    }
+    with open(args.output, "w", encoding="utf-8") as file:
+        json.dump(report, file, indent=2)
+    print(f"\nSaved results to {args.output}")
+
+    if args.compare:
+        compare(results, args.compare)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,26 @@
+import argparse
+import os
+import sys
+
+# Add the root directory to the Python path
+ROOT_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+sys.path.append(ROOT_DIR)
+
+from config import TRAINING_SENTENCES_PATH, LEGACY_TRAINING_SENTENCES_PATH
+from utils.sentence_store import load_sentences, save_sentences, SentenceStore
+
+def main():
+    parser = argparse.ArgumentParser(description="Convert a training_sentences.npy file into a compact sentence store.")
+    parser.add_argument("--source", default=LEGACY_TRAINING_SENTENCES_PATH, help="Legacy .npy sentences file.")
+    parser.add_argument("--target", default=TRAINING_SENTENCES_PATH, help="Sentence store to write.")
+    args = parser.parse_args()
+
+    sentences = load_sentences(args.source, mmap=False)
+    save_sentences(args.target, (str(sentence) for sentence in sentences))
+
+    store = SentenceStore.load(args.target)
+    print(f"Wrote {len(store)} sentences to {args.target}")
+    print(f"Size: {sentences.nbytes} bytes as a NumPy array, {store.nbytes} bytes as a sentence store")
+
+if __name__ == "__main__":
+    main()
@@ -1,12 +1,11 @@
+import argparse
 import sys
 import os
-import PyPDF2
 from nltk.tokenize import sent_tokenize
-from sentence_transformers import SentenceTransformer
 import faiss
 import numpy as np
 import time
-import requests
+from concurrent.futures import ThreadPoolExecutor
 
 # Add the root directory to the Python path
 ROOT_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
@@ -14,98 +13,288 @@ sys.path.append(ROOT_DIR)
 
 from config import (
     HUGGINGFACE_API_KEY,
-    SUMMARIZATION_MODEL,
+    SUMMARIZATION_API_URL,
+    SUMMARIZATION_CONCURRENCY,
+    SUMMARIZATION_BATCH_SIZE,
     EMBEDDING_MODEL,
     PDF_DIRECTORY,
     FAISS_INDEX_PATH,
     TRAINING_SENTENCES_PATH,
+    EMBEDDING_BATCH_SIZE,
+    FAISS_INDEX_SPEC,
 )
+from utils.embedding_model import get_model_stats
+from utils.http_client import create_session, get_session, post_json
+from utils.sentence_store import SentenceStore, load_sentences, save_sentences
+from utils.index_builder import describe_index, load_index, supports_removal
+from utils.build_cache import SummaryCache, file_sha256, load_manifest, manifest_matches_outputs, output_hashes, save_manifest
+from utils.pdf_extraction import extract_texts, iter_page_texts
+from utils.streaming_index import build_index_streaming
+from utils.text_chunker import dedup_sentences, find_boilerplate_lines, line_key, new_chunk_stats, removed_count
 
 # Hugging Face API URL and headers
-API_URL = f"https://api-inference.huggingface.co/models/{SUMMARIZATION_MODEL}"
+API_URL = SUMMARIZATION_API_URL
 HEADERS = {"Authorization": f"Bearer {HUGGINGFACE_API_KEY}"}
-
-# Initialize the embedding model
-embedding_model = SentenceTransformer(EMBEDDING_MODEL)
+SUMMARY_MAX_LENGTH = 130
+SUMMARY_MIN_LENGTH = 30
 
 # Function to extract text from a single PDF
 def extract_text_from_pdf(pdf_path):
+    return extract_texts([pdf_path], skip_failed=True)[0]
+
+def _truncate(text, max_words=1024):
+    words = text.split()
+    return " ".join(words[:max_words]) if len(words) > max_words else text
+
+def _summary_from_item(item, original):
+    # The API answers with [{"summary_text": ...}] per input, or "generated_text" for text2text models
+    if isinstance(item, list) and item:
+        item = item[0]
+    if isinstance(item, dict):
+        if "summary_text" in item:
+            return item["summary_text"]
+        if "generated_text" in item:
+            return item["generated_text"]
+    print(f"Unexpected API response structure: {item}")
+    return original  # Return original text if the response is invalid
+
+def summarize_batch(texts, max_length=SUMMARY_MAX_LENGTH, min_length=SUMMARY_MIN_LENGTH, api_url=None, session=None):
+    """
+    Summarizes several paragraphs with one Hugging Face Inference API request, sent on session
+    (the process-wide pooled session by default).
+    429/503 responses are retried with exponential backoff; on failure the original texts are returned.
+    """
+    texts = [_truncate(text) for text in texts]
+    payload = {
+        "inputs": texts if len(texts) > 1 else texts[0],
+        "parameters": {"max_length": max_length, "min_length": min_length, "do_sample": False},
+    }
     try:
-        with open(pdf_path, "rb") as file:
-            pdf_reader = PyPDF2.PdfReader(file)
-            return "".join(page.extract_text() for page in pdf_reader.pages)
+        summary = post_json(session or get_session(), api_url or API_URL, payload, headers=HEADERS)
     except Exception as e:
-        print(f"Error reading {pdf_path}: {e}")
-        return ""
+        print(f"Error summarizing text: {e}")
+        return texts  # Return original text if summarization fails
+
+    if len(texts) == 1:
+        return [_summary_from_item(summary, texts[0])]
+    if isinstance(summary, list) and len(summary) == len(texts):
+        return [_summary_from_item(item, text) for item, text in zip(summary, texts)]
+
+    # Some models don't accept batched inputs; fall back to one request per paragraph
+    print(f"Batched summarization returned {type(summary).__name__}; retrying paragraphs one by one.")
+    return [summarize_batch([text], max_length, min_length, api_url, session)[0] for text in texts]
 
 # Function to summarize text using Hugging Face API
-def summarize_text(text, max_length=130, min_length=30):
+def summarize_text(text, max_length=SUMMARY_MAX_LENGTH, min_length=SUMMARY_MIN_LENGTH, api_url=None, session=None):
     """
     Summarizes the given text using the Hugging Face Inference API.
     """
-    if len(text.split()) > 1024:  # Truncate text if too long
-        text = " ".join(text.split()[:1024])
-    payload = {"inputs": text, "parameters": {"max_length": max_length, "min_length": min_length, "do_sample": False}}
-    try:
-        response = requests.post(API_URL, headers=HEADERS, json=payload)
-        response.raise_for_status()
-        summary = response.json()
-
-        # Log the full API response for debugging
-        print(f"API Response: {summary}")
-
-        # Check if 'summary_text' exists in the response
-        if isinstance(summary, list) and "summary_text" in summary[0]:
-            return summary[0]["summary_text"]
-        elif isinstance(summary, list) and "generated_text" in summary[0]:
-            return summary[0]["generated_text"]
-        else:
-            print(f"Unexpected API response structure: {summary}")
-            return text  # Return original text if the response is invalid
+    return summarize_batch([text], max_length, min_length, api_url, session)[0]
 
-    except Exception as e:
-        print(f"Error summarizing text: {e}")
-        return text  # Return original text if summarization fails
+def summarize_paragraphs(paragraphs, concurrency=SUMMARIZATION_CONCURRENCY, batch_size=SUMMARIZATION_BATCH_SIZE,
+                         api_url=None, summary_cache=None, session=None):
+    """
+    Summarizes paragraphs with at most `concurrency` requests in flight, batch_size paragraphs per request.
+    Paragraphs found in summary_cache are not sent again. Summaries are returned in paragraph order.
+    """
+    summaries = summary_cache.get_many(paragraphs) if summary_cache is not None else [None] * len(paragraphs)
+    missing = [position for position, summary in enumerate(summaries) if summary is None]
 
-# Function to process PDFs and generate training sentences
-def generate_training_sentences(pdf_directory):
-    training_sentences = []
-    pdf_files = [os.path.join(pdf_directory, file) for file in os.listdir(pdf_directory) if file.endswith(".pdf")]
+    batches = [missing[start:start + batch_size] for start in range(0, len(missing), batch_size)]
+    with ThreadPoolExecutor(max_workers=max(1, concurrency)) as executor:
+        results = executor.map(lambda batch: summarize_batch([paragraphs[i] for i in batch], api_url=api_url, session=session), batches)
+        for batch, batch_summaries in zip(batches, results):
+            for position, summary in zip(batch, batch_summaries):
+                summaries[position] = summary
+
+    if summary_cache is not None:
+        # Failed requests fall back to the original text; only real summaries are worth keeping
+        summary_cache.put_many(
+            (paragraphs[i], summaries[i]) for i in missing if summaries[i] != _truncate(paragraphs[i])
+        )
+    return summaries
+
+def _iter_pdf_pages(pdf_files):
+    """
+    Yields (pdf_path, pages) one file at a time, so only one document's text is held in memory.
+    """
+    current_index, pages = None, []
+    for source_index, _, page_text in iter_page_texts(pdf_files, skip_failed=True):
+        if source_index != current_index and pages:
+            yield pdf_files[current_index], pages
+            pages = []
+        current_index = source_index
+        pages.append(page_text)
+    if pages:
+        yield pdf_files[current_index], pages
 
-    for pdf_path in pdf_files:
+def _strip_boilerplate(pages):
+    """
+    Removes headers/footers repeated across pages while keeping blank lines, which separate paragraphs.
+    """
+    boilerplate = find_boilerplate_lines(pages)
+    return "".join(
+        "\n".join(line for line in page.split("\n") if not line.strip() or line_key(line) not in boilerplate)
+        for page in pages
+    )
+
+# Function to process PDFs and stream training sentences
+def iter_training_sentences(pdf_directory, stats=None, concurrency=SUMMARIZATION_CONCURRENCY,
+                            batch_size=SUMMARIZATION_BATCH_SIZE, api_url=None, pdf_files=None,
+                            seen=None, summary_cache=None, file_counts=None, session=None):
+    """
+    Yields training sentences for the PDFs in pdf_directory (or just pdf_files) in file order.
+    The number of sentences yielded per file is recorded in file_counts when given.
+    """
+    if pdf_files is None:
+        pdf_files = list_pdf_files(pdf_directory)
+    seen = set() if seen is None else seen
+
+    for pdf_path, pages in _iter_pdf_pages(pdf_files):
         print(f"Processing: {pdf_path}")
-        text = extract_text_from_pdf(pdf_path)
-        paragraphs = text.split("\n\n")  # Split text into paragraphs
+        paragraphs = _strip_boilerplate(pages).split("\n\n")  # Split text into paragraphs
+        paragraphs = [paragraph for paragraph in paragraphs if paragraph.strip()]  # Skip empty paragraphs
+
+        start = time.perf_counter()
+        summaries = summarize_paragraphs(paragraphs, concurrency, batch_size, api_url, summary_cache, session)
+        print(f"Summarized {len(paragraphs)} paragraphs in {time.perf_counter() - start:.1f}s")
+
+        for summarized_text in summaries:
+            # Split into sentences, skipping ones already produced by another paragraph
+            for sentence in dedup_sentences(sent_tokenize(summarized_text), seen, stats):
+                if file_counts is not None:
+                    file_counts[pdf_path] = file_counts.get(pdf_path, 0) + 1
+                yield sentence
 
-        for paragraph in paragraphs:
-            if paragraph.strip():  # Skip empty paragraphs
-                summarized_text = summarize_text(paragraph)
-                training_sentences.extend(sent_tokenize(summarized_text))  # Split into sentences
+def generate_training_sentences(pdf_directory):
+    return list(iter_training_sentences(pdf_directory))
+
+def list_pdf_files(pdf_directory):
+    return [os.path.join(pdf_directory, file) for file in sorted(os.listdir(pdf_directory)) if file.endswith(".pdf")]
+
+def _id_range(entry):
+    return range(entry["start"], entry["start"] + entry["count"])
 
-    return training_sentences
+def parse_args():
+    parser = argparse.ArgumentParser(description="Build the pre-trained FAISS index from summarized PDF content.")
+    parser.add_argument(
+        "--index-spec",
+        default=FAISS_INDEX_SPEC,
+        help='Index type and parameters, e.g. "flat", "ivf-flat:nlist=256", "ivf-pq:m=16,nbits=8" or "hnsw:m=32".',
+    )
+    parser.add_argument("--api-url", default=API_URL, help="Summarization endpoint (point it at a local stub to test).")
+    parser.add_argument("--concurrency", type=int, default=SUMMARIZATION_CONCURRENCY, help="Summarization requests in flight.")
+    parser.add_argument("--batch-size", type=int, default=SUMMARIZATION_BATCH_SIZE, help="Paragraphs per summarization request.")
+    parser.add_argument("--full", action="store_true", help="Ignore the manifest and rebuild the index from scratch.")
+    return parser.parse_args()
 
 # Main function to generate FAISS index
 def main():
+    args = parse_args()
     os.makedirs(PDF_DIRECTORY, exist_ok=True)
     os.makedirs(os.path.dirname(FAISS_INDEX_PATH), exist_ok=True)
 
-    print("Generating training sentences from PDFs...")
-    training_sentences = generate_training_sentences(PDF_DIRECTORY)
-    training_sentences = [sentence.strip() for sentence in training_sentences if sentence.strip()]  # Clean sentences
+    pdf_files = list_pdf_files(PDF_DIRECTORY)
+    file_hashes = {os.path.basename(path): file_sha256(path) for path in pdf_files}
+    settings = {"embedding_model": EMBEDDING_MODEL, "index_spec": args.index_spec, "summarization_api": args.api_url}
+
+    # Decide between an incremental update and a full rebuild
+    manifest = load_manifest()
+    index = None
+    incremental = (
+        not args.full
+        and manifest is not None
+        and manifest.get("settings") == settings
+        # Another tool may have rewritten the index or sentences since the manifest was saved
+        and manifest_matches_outputs(manifest, (FAISS_INDEX_PATH, TRAINING_SENTENCES_PATH))
+    )
+    if incremental:
+        index = load_index(FAISS_INDEX_PATH, mmap=False)
+        # Only id-mapped indices written by this tool can have vectors replaced in place
+        incremental = isinstance(index, faiss.IndexIDMap) or faiss.try_extract_index_ivf(index) is not None
+
+    known_files = manifest["files"] if incremental else {}
+    changed = [path for path in pdf_files if known_files.get(os.path.basename(path), {}).get("hash") != file_hashes[os.path.basename(path)]]
+    stale = [name for name in known_files if name not in file_hashes or os.path.join(PDF_DIRECTORY, name) in changed]
+    stale_ids = [vector_id for name in stale for vector_id in _id_range(known_files[name])]
+
+    if incremental and stale_ids and not supports_removal(index):
+        print("The saved index type cannot remove vectors; rebuilding from scratch.")
+        incremental, known_files, index = False, {}, None
+        changed, stale_ids = pdf_files, []
+
+    if incremental and not changed and not stale:
+        print("Index is up to date; no PDFs were added, changed or removed.")
+        return
+
+    if incremental:
+        print(f"Incremental rebuild: {len(changed)} new or changed PDF(s), {len(stale)} stale PDF(s).")
+        next_id = manifest["next_id"]
+        if stale_ids:
+            removed = index.remove_ids(faiss.IDSelectorBatch(np.asarray(stale_ids, dtype="int64")))
+            print(f"Removed {removed} vectors of stale PDFs")
+        # Ids are positions in the sentence store; removed ids become empty placeholders
+        stale_id_set = set(stale_ids)
+        old_sentences = load_sentences(TRAINING_SENTENCES_PATH, mmap=False)
+        training_sentences = SentenceStore.from_iterable(
+            "" if position in stale_id_set else old_sentences[position] for position in range(next_id)
+        )
+        files = {name: entry for name, entry in known_files.items() if name not in stale}
+        # Sentences of untouched PDFs still count when deduplicating the new ones
+        seen = {line_key(training_sentences[i]) for entry in files.values() for i in _id_range(entry)}
+    else:
+        print("Full rebuild of the index.")
+        next_id, training_sentences, files, seen = 0, SentenceStore(), {}, set()
+
+    # Sentences are encoded and indexed in batches of EMBEDDING_BATCH_SIZE as they are produced
+    print("Generating, embedding and indexing training sentences from PDFs...")
+    stats = new_chunk_stats()
+    file_counts = {}
+    # Cached summaries are only valid for the same endpoint and length limits
+    summary_cache = SummaryCache(namespace=f"{args.api_url}|{SUMMARY_MAX_LENGTH}|{SUMMARY_MIN_LENGTH}")
+    # Keep-alive connection pool shared by all summarization threads, one connection per request in flight
+    session = create_session(pool_size=max(1, args.concurrency))
+    index, training_sentences = build_index_streaming(
+        iter_training_sentences(
+            PDF_DIRECTORY, stats, args.concurrency, args.batch_size, args.api_url,
+            pdf_files=changed, seen=seen, summary_cache=summary_cache, file_counts=file_counts, session=session,
+        ),
+        index=index,
+        batch_size=EMBEDDING_BATCH_SIZE,
+        model_name=EMBEDDING_MODEL,
+        sentence_sink=training_sentences,
+        index_spec=args.index_spec,
+        id_start=next_id,
+    )
+    summary_cache.close()
+    session.close()
+    if index is None:
+        print("No training sentences were generated; nothing to save.")
+        return
 
-    print("Generating embeddings...")
-    embeddings = embedding_model.encode(training_sentences)
+    # Sentences were assigned consecutive ids in file order
+    for path in changed:
+        count = file_counts.get(path, 0)
+        files[os.path.basename(path)] = {"hash": file_hashes[os.path.basename(path)], "start": next_id, "count": count}
+        next_id += count
 
-    print("Creating FAISS index...")
-    index = faiss.IndexFlatL2(embeddings.shape[1])
-    index.add(embeddings)
+    print(f"Removed {removed_count(stats)} of {stats['input_lines']} sentences: {stats}")
+    print(f"Summary cache: {summary_cache.hits} hits, {summary_cache.misses} misses")
+    print(f"Embedding model stats: {get_model_stats()}")
+    print(f"Built index: {describe_index(index)}")
 
-    # Save FAISS index and training sentences
+    # Save FAISS index, training sentences and the manifest describing them
     faiss.write_index(index, FAISS_INDEX_PATH)
-    np.save(TRAINING_SENTENCES_PATH, training_sentences)
+    save_sentences(TRAINING_SENTENCES_PATH, training_sentences)
+    save_manifest({
+        "settings": settings,
+        "next_id": next_id,
+        "files": files,
+        "outputs": output_hashes((FAISS_INDEX_PATH, TRAINING_SENTENCES_PATH)),
+    })
 
     print(f"FAISS index saved to {FAISS_INDEX_PATH}")
     print(f"Training sentences saved to {TRAINING_SENTENCES_PATH}")
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
@@ -0,0 +1,261 @@
+import argparse
+import json
+import logging
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+
+import numpy as np
+
+# Add the root directory to the Python path
+ROOT_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+sys.path.append(ROOT_DIR)
+
+from config import ANSWER_CACHE_SIMILARITY, FAISS_INDEX_PATH, LEGACY_TRAINING_SENTENCES_PATH, TRAINING_SENTENCES_PATH
+from backend.answer_cache import AnswerCache
+from backend.chatbot import ERROR_RESPONSE, handle_user_message, handle_user_message_stream
+from utils.http_client import request_stats
+from utils.llm_handler import llm_flights, llm_limiter
+from stub_inference_server import create_server, parse_args as parse_stub_args
+
+# (weight, question): mostly common HR questions, so repeats exercise the query and answer caches
+DEFAULT_MIX = [
+    (5, "How many days of annual leave do I get?"),
+    (4, "When is salary paid each month?"),
+    (3, "How do I apply for sick leave?"),
+    (3, "What is the notice period when resigning?"),
+    (2, "Can I carry over unused leave to next year?"),
+    (2, "How do I claim travel expenses?"),
+    (2, "What are the rules for working from home?"),
+    (1, "Who do I contact about a payroll mistake?"),
+    (1, "Is parental leave paid?"),
+    (1, "What's the weather like on Mars?"),
+]
+
+def load_question_mix(path):
+    """
+    Reads a question mix from JSON: either {"question": weight, ...} or a list of questions of equal weight.
+    """
+    with open(path, "r", encoding="utf-8") as file:
+        data = json.load(file)
+    if isinstance(data, dict):
+        return [(float(weight), question) for question, weight in data.items()]
+    return [(1, question) for question in data]
+
+def in_process_sender(model_name, stream, cache):
+    """
+    Returns send(question, session_id) -> (ok, time to first token) calling handle_user_message directly,
+    with the pre-trained index loaded like the chat API service loads it.
+    """
+    from utils.resource_cache import acquire_training_data
+
+    sentences_path = TRAINING_SENTENCES_PATH if os.path.exists(TRAINING_SENTENCES_PATH) else LEGACY_TRAINING_SENTENCES_PATH
+    index, sentences = acquire_training_data(FAISS_INDEX_PATH, sentences_path).value
+
+    def send(question, session_id):
+        if not stream:
+            response = handle_user_message(question, index, sentences, model_name, cache=cache(), session_id=session_id)
+            return response != ERROR_RESPONSE, None
+        start = time.perf_counter()
+        first_token = None
+        pieces = []
+        for token in handle_user_message_stream(question, index, sentences, model_name, cache=cache(),
+                                                session_id=session_id):
+            if first_token is None:
+                first_token = time.perf_counter() - start
+            pieces.append(token)
+        return "".join(pieces) != ERROR_RESPONSE, first_token
+
+    return send
+
+def http_sender(api_url, model_name, stream):
+    """
+    Returns send(question, session_id) -> (ok, time to first token) calling the chat API service.
+    """
+    from backend.api_client import chat, chat_stream
+
+    def send(question, session_id):
+        try:
+            if not stream:
+                return chat(question, model_name, session_id=session_id, api_url=api_url) != ERROR_RESPONSE, None
+            start = time.perf_counter()
+            first_token = None
+            pieces = []
+            for token in chat_stream(question, model_name, session_id=session_id, api_url=api_url):
+                if first_token is None:
+                    first_token = time.perf_counter() - start
+                pieces.append(token)
+            return "".join(pieces) != ERROR_RESPONSE, first_token
+        except RuntimeError:
+            return False, None
+
+    return send
+
+def run_level(send, concurrency, duration, mix, unique_fraction, think_ms, seed):
+    """
+    Runs `concurrency` simulated sessions for `duration` seconds. Each session sends a question,
+    waits for the full answer, thinks for think_ms and repeats.
+    """
+    weights = [weight for weight, _ in mix]
+    questions = [question for _, question in mix]
+    latencies, first_tokens = [], []
+    counts = {"ok": 0, "errors": 0, "exceptions": 0}
+    lock = threading.Lock()
+    deadline = time.monotonic() + duration
+
+    def session(number):
+        rng = random.Random(seed * 100003 + number)
+        session_id = f"load-{concurrency}-{number}"
+        sent = 0
+        while time.monotonic() < deadline:
+            question = rng.choices(questions, weights)[0]
+            if rng.random() < unique_fraction:
+                # A one-off variant of the question, so it cannot be answered from a cache
+                question = f"{question} (ref {session_id}-{sent})"
+            sent += 1
+            start = time.perf_counter()
+            try:
+                ok, first_token = send(question, session_id)
+                outcome = "ok" if ok else "errors"
+            except Exception:
+                first_token, outcome = None, "exceptions"
+            elapsed = time.perf_counter() - start
+            with lock:
+                latencies.append(elapsed)
+                counts[outcome] += 1
+                if first_token is not None:
+                    first_tokens.append(first_token)
+            if think_ms:
+                time.sleep(rng.expovariate(1000 / think_ms))
+
+    start = time.perf_counter()
+    threads = [threading.Thread(target=session, args=(number,), daemon=True) for number in range(concurrency)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    wall = time.perf_counter() - start
+
+    latencies_ms = np.array(latencies or [0.0]) * 1000
+    total = len(latencies)
+    result = {
+        "concurrency": concurrency,
+        "requests": total,
+        "throughput": total / wall,
+        "p50_ms": float(np.percentile(latencies_ms, 50)),
+        "p90_ms": float(np.percentile(latencies_ms, 90)),
+        "p99_ms": float(np.percentile(latencies_ms, 99)),
+        "max_ms": float(latencies_ms.max()),
+        "error_rate": (counts["errors"] + counts["exceptions"]) / total if total else 0.0,
+        **counts,
+    }
+    if first_tokens:
+        result["first_token_p50_ms"] = float(np.percentile(first_tokens, 50) * 1000)
+        result["first_token_p99_ms"] = float(np.percentile(first_tokens, 99) * 1000)
+    return result
+
+def find_knee(results, min_gain=0.1):
+    """
+    Returns the concurrency after which throughput grows by less than min_gain (10%) per step,
+    or None if it kept scaling over the whole ramp.
+    """
+    for previous, current in zip(results, results[1:]):
+        if current["throughput"] < previous["throughput"] * (1 + min_gain):
+            return previous["concurrency"]
+    return None
+
+def _failed_upstream_attempts():
+    # Every attempt is recorded, so 503s that were retried successfully still count
+    return sum(url["errors"] for url in request_stats.summary().values())
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Ramp up concurrent chat sessions and report throughput, latency and errors.")
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 2, 4, 8, 16, 32], help="Sessions per ramp step.")
+    parser.add_argument("--duration", type=float, default=20.0, help="Seconds each ramp step runs.")
+    parser.add_argument("--think-ms", type=float, default=0.0, help="Mean pause of a session between messages.")
+    parser.add_argument("--mix", help="JSON question mix: {\"question\": weight} or a list of questions.")
+    parser.add_argument("--unique-fraction", type=float, default=0.3,
+                        help="Fraction of messages made unique so they miss the caches.")
+    parser.add_argument("--stream", action="store_true", help="Use the streaming path and report time to first token.")
+    parser.add_argument("--api-url",
+                        help="Drive the chat API service at this URL instead of calling the backend in-process "
+                             "(the service must list --llm-url in CHAT_API_MODELS).")
+    parser.add_argument("--llm-url", default="http://127.0.0.1:8089/", help="Inference endpoint the chatbot calls.")
+    parser.add_argument("--answer-cache", action="store_true",
+                        help="Use a fresh semantic answer cache for every step (in-process only).")
+    parser.add_argument("--start-stub", action="store_true",
+                        help="Start the stub inference server in this process on --llm-url's port.")
+    parser.add_argument("--stub-args", default="", help='Arguments for the started stub, e.g. "--latency-dist lognormal".')
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="Save the results as JSON.")
+    parser.add_argument("--verbose", action="store_true", help="Keep the chatbot's INFO and retry logging on the console.")
+    return parser.parse_args()
+
+def main():
+    args = parse_args()
+    mix = load_question_mix(args.mix) if args.mix else DEFAULT_MIX
+    if not args.verbose:
+        logging.getLogger("NEXA_HR_Chatbot").setLevel(logging.ERROR)
+
+    stub = None
+    if args.start_stub:
+        port = int(args.llm_url.rstrip("/").rsplit(":", 1)[-1])
+        stub = create_server(parse_stub_args(["--port", str(port)] + args.stub_args.split()))
+        threading.Thread(target=stub.serve_forever, name="stub-inference", daemon=True).start()
+        print(f"Started stub inference server on port {port} with {args.stub_args or 'default settings'}")
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        caches = {"current": None}
+        if args.api_url:
+            send = http_sender(args.api_url, args.llm_url, args.stream)
+        else:
+            # A fresh cache per step keeps steps comparable; without --answer-cache a threshold
+            # above 1 means no cosine similarity ever matches, so every answer is generated
+            send = in_process_sender(args.llm_url, args.stream, lambda: caches["current"])
+
+        results = []
+        print(f"{'sessions':>8}{'requests':>10}{'req/s':>10}{'p50 ms':>10}{'p90 ms':>10}{'p99 ms':>10}"
+              f"{'errors':>9}{'upstream errors':>17}")
+        for step, concurrency in enumerate(args.concurrency):
+            if not args.api_url:
+                caches["current"] = AnswerCache(
+                    db_path=os.path.join(tmp_dir, f"answer_cache-{step}.db"),
+                    threshold=ANSWER_CACHE_SIMILARITY if args.answer_cache else 2.0,
+                )
+            statuses_before = dict(stub.status_counts) if stub else None
+            failures_before = _failed_upstream_attempts()
+
+            result = run_level(send, concurrency, args.duration, mix, args.unique_fraction, args.think_ms, args.seed)
+            result["upstream_errors"] = _failed_upstream_attempts() - failures_before
+            if stub:
+                result["stub_status_counts"] = {
+                    str(status): count - statuses_before.get(status, 0) for status, count in stub.status_counts.items()
+                }
+            result["llm_limiter"] = llm_limiter.stats()
+            results.append(result)
+            print(
+                f"{concurrency:>8}{result['requests']:>10}{result['throughput']:>10.2f}{result['p50_ms']:>10.1f}"
+                f"{result['p90_ms']:>10.1f}{result['p99_ms']:>10.1f}{result['error_rate']:>8.1%}{result['upstream_errors']:>17}"
+            )
+
+    knee = find_knee(results)
+    if knee is None:
+        print("Throughput kept scaling over the whole ramp; try higher concurrency.")
+    else:
+        print(f"Throughput stops scaling at about {knee} concurrent sessions.")
+
+    if args.output:
+        report = {"settings": vars(args), "knee": knee, "llm_flights": llm_flights.stats(), "steps": results}
+        with open(args.output, "w", encoding="utf-8") as file:
+            json.dump(report, file, indent=2)
+        print(f"Saved results to {args.output}")
+
+    if stub:
+        stub.shutdown()
+        stub.server_close()
+
+if __name__ == "__main__":
+    main()
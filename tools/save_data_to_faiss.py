@@ -1,9 +1,7 @@
+import argparse
 import sys
 import os
-from sentence_transformers import SentenceTransformer
 import faiss
-import numpy as np
-import PyPDF2
 
 # Add the root directory to the Python path
 ROOT_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
@@ -15,36 +13,32 @@ from config import (
     PDF_DIRECTORY,
     FAISS_INDEX_PATH,
     TRAINING_SENTENCES_PATH,
+    FAISS_INDEX_SPEC,
 )
-
-# Load the embedding model from config
-embedding_model = SentenceTransformer(EMBEDDING_MODEL)
+from utils.build_cache import remove_manifest
+from utils.embedding_model import encode, get_model_stats
+from utils.sentence_store import save_sentences
+from utils.index_builder import build_index, describe_index
+from utils.pdf_extraction import extract_pages, extract_texts
+from utils.text_chunker import chunk_documents, removed_count
 
 # Function to extract text from a single PDF
 def extract_text_from_pdf(pdf_path):
     """
     Extracts text from a single PDF file.
     """
-    try:
-        with open(pdf_path, "rb") as file:
-            pdf_reader = PyPDF2.PdfReader(file)
-            text = ""
-            for page in pdf_reader.pages:
-                text += page.extract_text()
-            return text
-    except Exception as e:
-        print(f"Error reading {pdf_path}: {e}")
-        return ""
+    return extract_texts([pdf_path], skip_failed=True)[0]
 
 # Function to process multiple PDFs
 def process_multiple_pdfs(pdf_paths):
     """
-    Processes multiple PDF files and returns a list of sentences.
+    Processes multiple PDF files in parallel and returns a list of sentences.
     """
-    all_text = ""
-    for pdf_path in pdf_paths:
-        all_text += extract_text_from_pdf(pdf_path) + "\n"
-    return all_text.split("\n")  # Split text into sentences
+    pages_by_file = extract_pages(pdf_paths, skip_failed=True)
+    # Drop blank lines, repeated headers/footers and duplicates before they reach the encoder
+    sentences, stats = chunk_documents(pages_by_file)
+    print(f"Removed {removed_count(stats)} of {stats['input_lines']} lines: {stats}")
+    return sentences
 
 # Training data (e.g., HR policies, FAQs)
 training_sentences = [
@@ -68,23 +62,41 @@ training_sentences = [
     "In emergency leave situations, employees must notify their supervisor immediately and log the request online.",
 ]
 
-# Extract sentences from PDFs
-pdf_files = [os.path.join(PDF_DIRECTORY, file) for file in os.listdir(PDF_DIRECTORY) if file.endswith(".pdf")]
-pdf_sentences = process_multiple_pdfs(pdf_files)
+def parse_args():
+    parser = argparse.ArgumentParser(description="Build the pre-trained FAISS index from the PDFs in PDF_DIRECTORY.")
+    parser.add_argument(
+        "--index-spec",
+        default=FAISS_INDEX_SPEC,
+        help='Index type and parameters, e.g. "flat", "ivf-flat:nlist=256", "ivf-pq:m=16,nbits=8" or "hnsw:m=32".',
+    )
+    return parser.parse_args()
+
+def main():
+    args = parse_args()
+
+    # Extract sentences from PDFs
+    pdf_files = [os.path.join(PDF_DIRECTORY, file) for file in sorted(os.listdir(PDF_DIRECTORY)) if file.endswith(".pdf")]
+    pdf_sentences = process_multiple_pdfs(pdf_files)
+
+    # Combine training data with PDF sentences
+    all_sentences = training_sentences + pdf_sentences
 
-# Combine training data with PDF sentences
-all_sentences = training_sentences + pdf_sentences
+    # Generate embeddings
+    all_embeddings = encode(all_sentences, model_name=EMBEDDING_MODEL)
+    print(f"Embedding model stats: {get_model_stats()}")
 
-# Generate embeddings
-all_embeddings = embedding_model.encode(all_sentences)
+    # Create a FAISS index of the requested type
+    index = build_index(all_embeddings, spec=args.index_spec)
+    print(f"Built index: {describe_index(index)}")
 
-# Create a FAISS index
-index = faiss.IndexFlatL2(all_embeddings.shape[1])
-index.add(all_embeddings)
+    # Save the index and sentences
+    faiss.write_index(index, FAISS_INDEX_PATH)
+    save_sentences(TRAINING_SENTENCES_PATH, all_sentences)
+    # The incremental builder's manifest described the files just replaced
+    remove_manifest()
 
-# Save the index and sentences
-faiss.write_index(index, FAISS_INDEX_PATH)
-np.save(TRAINING_SENTENCES_PATH, all_sentences)
+    print(f"FAISS index saved to {FAISS_INDEX_PATH}")
+    print(f"Training sentences saved to {TRAINING_SENTENCES_PATH}")
 
-print(f"FAISS index saved to {FAISS_INDEX_PATH}")
-print(f"Training sentences saved to {TRAINING_SENTENCES_PATH}")
\ No newline at end of file
+if __name__ == "__main__":
+    main()
\ No newline at end of file
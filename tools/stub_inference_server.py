@@ -0,0 +1,165 @@
+import argparse
+import json
+import math
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+STUB_ANSWER = "This is a stub answer from the local inference server."
+
+def make_output(task, text):
+    """
+    Builds one result item in the shape the Hugging Face Inference API returns for the task.
+    """
+    if task == "summarization":
+        words = text.split()
+        return {"summary_text": " ".join(words[:30])}
+    return {"generated_text": f"{text} {STUB_ANSWER}"}
+
+def sample_latency(settings, rng):
+    """
+    Draws one response delay in seconds: fixed, exponential with mean latency_ms,
+    or lognormal with median latency_ms and shape latency_sigma.
+    """
+    if settings.latency_ms <= 0:
+        return 0.0
+    if settings.latency_dist == "exponential":
+        return rng.expovariate(1000 / settings.latency_ms)
+    if settings.latency_dist == "lognormal":
+        return rng.lognormvariate(math.log(settings.latency_ms / 1000), settings.latency_sigma)
+    return settings.latency_ms / 1000
+
+class StubInferenceHandler(BaseHTTPRequestHandler):
+    """
+    Answers POST requests like the Inference API: a single input returns [item],
+    a list of inputs returns one item per input, and {"stream": true} returns server-sent events.
+    Requests fail with 503 at fail_rate, or when more than max_concurrent are being answered.
+    """
+
+    server_version = "StubInference/1.0"
+
+    def do_POST(self):
+        settings = self.server.settings
+        length = int(self.headers.get("Content-Length", 0))
+        try:
+            payload = json.loads(self.rfile.read(length) or b"{}")
+        except json.JSONDecodeError:
+            self._send_json(400, {"error": "Request body is not valid JSON."})
+            return
+
+        with self.server.lock:
+            self.server.request_count += 1
+            overloaded = bool(settings.max_concurrent) and self.server.in_flight >= settings.max_concurrent
+            failing = overloaded or self.server.rng.random() < settings.fail_rate
+            delay = sample_latency(settings, self.server.rng)
+            if not overloaded:
+                self.server.in_flight += 1
+
+        if overloaded:
+            # An overloaded endpoint turns requests away at once instead of queueing them
+            self._send_unavailable()
+            return
+        try:
+            time.sleep(delay)
+            if failing:
+                self._send_unavailable()
+            elif payload.get("stream") and settings.task == "text-generation":
+                self._send_stream(str(payload.get("inputs", "")))
+            else:
+                inputs = payload.get("inputs", "")
+                if isinstance(inputs, list):
+                    body = [make_output(settings.task, str(text)) for text in inputs]
+                else:
+                    body = [make_output(settings.task, str(inputs))]
+                self._send_json(200, body)
+        finally:
+            with self.server.lock:
+                self.server.in_flight -= 1
+
+    def _send_unavailable(self):
+        estimated_time = self.server.settings.estimated_time
+        self._send_json(503, {"error": "Model is currently loading", "estimated_time": estimated_time},
+                        extra_headers={"Retry-After": str(max(1, math.ceil(estimated_time)))})
+
+    def _send_stream(self, prompt):
+        # Token events like text-generation-inference; the final special token carries the full text
+        self._count_status(200)
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Cache-Control", "no-cache")
+        self.end_headers()
+        words = STUB_ANSWER.split(" ")
+        for position, word in enumerate(words):
+            event = {"token": {"text": word if position == 0 else f" {word}", "special": False}}
+            self.wfile.write(f"data:{json.dumps(event)}\n\n".encode("utf-8"))
+            self.wfile.flush()
+            time.sleep(self.server.settings.token_ms / 1000)
+        final = {"token": {"text": "</s>", "special": True}, "generated_text": STUB_ANSWER}
+        self.wfile.write(f"data:{json.dumps(final)}\n\n".encode("utf-8"))
+        self.wfile.flush()
+
+    def _count_status(self, status):
+        with self.server.lock:
+            self.server.status_counts[status] = self.server.status_counts.get(status, 0) + 1
+
+    def _send_json(self, status, body, extra_headers=None):
+        self._count_status(status)
+        data = json.dumps(body).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        for name, value in (extra_headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, format, *args):
+        if self.server.settings.verbose:
+            super().log_message(format, *args)
+
+def create_server(settings):
+    """
+    Creates (but does not start) a stub server; use serve_forever() or run it in a thread.
+    """
+    server = ThreadingHTTPServer((settings.host, settings.port), StubInferenceHandler)
+    server.daemon_threads = True
+    server.settings = settings
+    server.lock = threading.Lock()
+    server.rng = random.Random(settings.seed)
+    server.request_count = 0
+    server.status_counts = {}
+    server.in_flight = 0
+    return server
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Local stand-in for the Hugging Face Inference API.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8089)
+    parser.add_argument("--task", choices=["summarization", "text-generation"], default="text-generation")
+    parser.add_argument("--latency-ms", type=float, default=50.0, help="Typical delay before each response.")
+    parser.add_argument("--latency-dist", choices=["fixed", "exponential", "lognormal"], default="fixed",
+                        help="fixed, exponential (mean latency-ms) or lognormal (median latency-ms).")
+    parser.add_argument("--latency-sigma", type=float, default=0.5, help="Shape of the lognormal distribution.")
+    parser.add_argument("--token-ms", type=float, default=20.0, help="Delay between streamed tokens.")
+    parser.add_argument("--fail-rate", type=float, default=0.0, help="Fraction of requests answered with 503.")
+    parser.add_argument("--max-concurrent", type=int, default=0,
+                        help="Answer 503 while this many requests are in progress (0: no limit).")
+    parser.add_argument("--estimated-time", type=float, default=1.0, help="estimated_time sent with 503 responses.")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--verbose", action="store_true", help="Log every request.")
+    return parser.parse_args(argv)
+
+def main():
+    settings = parse_args()
+    server = create_server(settings)
+    print(f"Stub inference server ({settings.task}) listening on http://{settings.host}:{server.server_port}/")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,122 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import uuid
+
+from config import INDEX_BUILD_CACHE_DIR
+
+MANIFEST_VERSION = 1
+
+def file_sha256(path, chunk_size=1024 * 1024):
+    """
+    Returns the SHA-256 hex digest of a file on disk.
+    """
+    digest = hashlib.sha256()
+    with open(path, "rb") as file:
+        for chunk in iter(lambda: file.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+def manifest_path(cache_dir=INDEX_BUILD_CACHE_DIR):
+    return os.path.join(cache_dir, "manifest.json")
+
+def load_manifest(cache_dir=INDEX_BUILD_CACHE_DIR):
+    """
+    Returns the manifest of the last index build, or None if there is no usable one.
+
+    The manifest records the build settings, the next free vector id and, per PDF,
+    its content hash and the contiguous id range [start, start + count) of its sentences.
+    """
+    try:
+        with open(manifest_path(cache_dir), "r", encoding="utf-8") as file:
+            manifest = json.load(file)
+    except (OSError, ValueError):
+        return None
+    if manifest.get("version") != MANIFEST_VERSION:
+        return None
+    return manifest
+
+def save_manifest(manifest, cache_dir=INDEX_BUILD_CACHE_DIR):
+    os.makedirs(cache_dir, exist_ok=True)
+    path = manifest_path(cache_dir)
+    tmp_path = f"{path}.{uuid.uuid4().hex}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as file:
+        json.dump(dict(manifest, version=MANIFEST_VERSION), file, indent=2, sort_keys=True)
+    os.replace(tmp_path, path)
+
+def output_hashes(paths):
+    """
+    Returns {path: SHA-256} of the files a build wrote, so a later build can tell whether
+    something else has replaced them since.
+    """
+    return {path: file_sha256(path) for path in paths}
+
+def manifest_matches_outputs(manifest, paths):
+    """
+    True if every file in paths still has the content recorded in the manifest.
+    """
+    recorded = manifest.get("outputs") or {}
+    try:
+        return all(path in recorded and recorded[path] == file_sha256(path) for path in paths)
+    except OSError:
+        return False
+
+def remove_manifest(cache_dir=INDEX_BUILD_CACHE_DIR):
+    """
+    Deletes the manifest, e.g. after a full build by a tool that does not keep one.
+    """
+    try:
+        os.remove(manifest_path(cache_dir))
+    except FileNotFoundError:
+        pass
+
+class SummaryCache:
+    """
+    Persistent paragraph-hash -> summary cache, so rebuilds only summarize paragraphs they have not seen.
+    Safe to use from several summarization threads.
+    """
+
+    def __init__(self, cache_dir=INDEX_BUILD_CACHE_DIR, namespace=""):
+        os.makedirs(cache_dir, exist_ok=True)
+        self.namespace = namespace
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(os.path.join(cache_dir, "summaries.db"), check_same_thread=False)
+        self._conn.execute("CREATE TABLE IF NOT EXISTS summaries (key TEXT PRIMARY KEY, summary TEXT NOT NULL)")
+        self._conn.commit()
+        self.hits = 0
+        self.misses = 0
+
+    def key(self, paragraph):
+        # namespace identifies the summarization model and parameters
+        return hashlib.sha256(f"{self.namespace}\0{paragraph}".encode("utf-8")).hexdigest()
+
+    def get_many(self, paragraphs):
+        """
+        Returns a list with the cached summary, or None, for each paragraph.
+        """
+        with self._lock:
+            results = []
+            for paragraph in paragraphs:
+                row = self._conn.execute("SELECT summary FROM summaries WHERE key = ?", (self.key(paragraph),)).fetchone()
+                results.append(row[0] if row else None)
+            found = sum(result is not None for result in results)
+            self.hits += found
+            self.misses += len(results) - found
+            return results
+
+    def put_many(self, pairs):
+        """
+        Stores (paragraph, summary) pairs.
+        """
+        with self._lock:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO summaries (key, summary) VALUES (?, ?)",
+                [(self.key(paragraph), summary) for paragraph, summary in pairs],
+            )
+            self._conn.commit()
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
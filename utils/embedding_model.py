@@ -0,0 +1,77 @@
+import os
+import resource
+import threading
+import time
+
+from config import EMBEDDING_MODEL
+from utils.logger import setup_logger
+
+logger = setup_logger()
+
+# One SentenceTransformer per model name for the whole process
+_models = {}
+_load_stats = {}
+_lock = threading.Lock()
+
+def _current_rss_bytes():
+    """
+    Returns the resident set size of the current process in bytes.
+    Falls back to the peak RSS on platforms without /proc.
+    """
+    try:
+        with open("/proc/self/statm", "r") as statm:
+            resident_pages = int(statm.read().split()[1])
+        return resident_pages * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # ru_maxrss is reported in kilobytes on Linux and bytes on macOS
+        return peak if os.uname().sysname == "Darwin" else peak * 1024
+
+def get_embedding_model(model_name=EMBEDDING_MODEL):
+    """
+    Returns the shared SentenceTransformer for model_name, loading it on first use.
+    """
+    model = _models.get(model_name)
+    if model is not None:
+        return model
+
+    with _lock:
+        # Another thread may have finished loading while we waited for the lock
+        if model_name not in _models:
+            # Imported here so that importing this module stays cheap
+            from sentence_transformers import SentenceTransformer
+
+            rss_before = _current_rss_bytes()
+            start = time.perf_counter()
+            _models[model_name] = SentenceTransformer(model_name)
+            load_seconds = time.perf_counter() - start
+            rss_delta = _current_rss_bytes() - rss_before
+
+            _load_stats[model_name] = {
+                "load_seconds": load_seconds,
+                "rss_delta_bytes": rss_delta,
+                "rss_after_bytes": rss_before + rss_delta,
+            }
+            logger.info(
+                f"Loaded embedding model '{model_name}' in {load_seconds:.2f}s "
+                f"(+{rss_delta / (1024 * 1024):.1f} MiB resident)"
+            )
+    return _models[model_name]
+
+def encode(sentences, model_name=EMBEDDING_MODEL, **kwargs):
+    """
+    Encodes sentences with the shared embedding model.
+    """
+    return get_embedding_model(model_name).encode(sentences, **kwargs)
+
+def is_model_loaded(model_name=EMBEDDING_MODEL):
+    """
+    Returns True if model_name has already been loaded in this process.
+    """
+    return model_name in _models
+
+def get_model_stats():
+    """
+    Returns cold-start statistics (load time and resident memory) for every loaded model.
+    """
+    return {name: dict(stats) for name, stats in _load_stats.items()}
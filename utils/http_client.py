@@ -0,0 +1,172 @@
+import random
+import threading
+import time
+from collections import deque
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from config import (
+    HTTP_POOL_SIZE,
+    HTTP_CONNECT_TIMEOUT,
+    HTTP_READ_TIMEOUT,
+    HTTP_MAX_RETRIES,
+    HTTP_BACKOFF_BASE,
+    HTTP_MAX_BACKOFF,
+)
+from utils.logger import setup_logger
+
+logger = setup_logger()
+
+# Status codes that mean "try again later" rather than "this request is wrong"
+RETRY_STATUS_CODES = (429, 503)
+
+def create_session(pool_size=HTTP_POOL_SIZE):
+    """
+    Creates a requests.Session whose connection pool keeps up to pool_size connections alive per host.
+    """
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
+
+_shared_session = None
+_shared_session_lock = threading.Lock()
+
+def get_session():
+    """
+    Returns the process-wide pooled session, so every chat request reuses warm keep-alive connections.
+    """
+    global _shared_session
+    with _shared_session_lock:
+        if _shared_session is None:
+            _shared_session = create_session()
+        return _shared_session
+
+def backoff_delay(attempt, base=HTTP_BACKOFF_BASE, retry_after=None, max_delay=HTTP_MAX_BACKOFF):
+    """
+    Seconds to wait before retry number `attempt` (starting at 0): exponential backoff with jitter,
+    or the server's requested wait (Retry-After or estimated_time) when it asks for longer.
+    """
+    delay = base * (2 ** attempt)
+    # Equal jitter keeps clients that failed together from retrying together
+    delay = delay / 2 + random.uniform(0, delay / 2)
+    if retry_after:
+        try:
+            delay = max(delay, float(retry_after))
+        except (TypeError, ValueError):
+            pass
+    return min(delay, max_delay)
+
+def _estimated_time(response):
+    # A model that is still loading answers 503 with {"error": ..., "estimated_time": seconds}
+    try:
+        body = response.json()
+    except ValueError:
+        return None
+    return body.get("estimated_time") if isinstance(body, dict) else None
+
+class RequestStats:
+    """
+    Thread-safe record of recent request latencies per URL.
+    """
+
+    def __init__(self, window=1000):
+        self.window = window
+        self._samples = {}
+        self._errors = {}
+        self._lock = threading.Lock()
+
+    def record(self, url, seconds, ok=True):
+        with self._lock:
+            self._samples.setdefault(url, deque(maxlen=self.window)).append(seconds)
+            if not ok:
+                self._errors[url] = self._errors.get(url, 0) + 1
+
+    def summary(self):
+        """
+        Returns count, errors and p50/p95/p99/max latency in seconds for each URL.
+        """
+        with self._lock:
+            result = {}
+            for url, samples in self._samples.items():
+                ordered = sorted(samples)
+                percentile = lambda q: ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+                result[url] = {
+                    "count": len(ordered),
+                    "errors": self._errors.get(url, 0),
+                    "p50": percentile(0.50),
+                    "p95": percentile(0.95),
+                    "p99": percentile(0.99),
+                    "max": ordered[-1],
+                }
+            return result
+
+request_stats = RequestStats()
+
+def post_json(session, url, payload, headers=None, timeout=(HTTP_CONNECT_TIMEOUT, HTTP_READ_TIMEOUT),
+              max_retries=HTTP_MAX_RETRIES, backoff_base=HTTP_BACKOFF_BASE, deadline=None, stats=request_stats):
+    """
+    POSTs a JSON payload and returns the decoded JSON response.
+
+    429 and 503 responses and connection errors are retried with jittered exponential backoff up to
+    max_retries times, waiting at least as long as Retry-After or a loading model's estimated_time.
+    With a deadline (seconds), no attempt or wait is started that would end past it. Any other HTTP
+    error is raised immediately. Every attempt's latency is recorded in stats.
+    """
+    response = _post_with_retries(session, url, payload, headers, timeout, max_retries, backoff_base, deadline, stats)
+    return response.json()
+
+def post_stream(session, url, payload, headers=None, timeout=(HTTP_CONNECT_TIMEOUT, HTTP_READ_TIMEOUT),
+                max_retries=HTTP_MAX_RETRIES, backoff_base=HTTP_BACKOFF_BASE, deadline=None, stats=request_stats):
+    """
+    Like post_json, but returns the response with its body unread so it can be consumed incrementally
+    (e.g. with iter_lines). Retries only happen before the body starts; the caller must close the response.
+    Recorded latency is the time to the response headers.
+    """
+    return _post_with_retries(session, url, payload, headers, timeout, max_retries, backoff_base, deadline, stats,
+                              stream=True)
+
+def _post_with_retries(session, url, payload, headers, timeout, max_retries, backoff_base, deadline, stats,
+                       stream=False):
+    connect_timeout, read_timeout = timeout
+    give_up_at = time.monotonic() + deadline if deadline is not None else None
+
+    for attempt in range(max_retries + 1):
+        if give_up_at is not None:
+            read_timeout = min(timeout[1], max(give_up_at - time.monotonic(), 0.1))
+
+        start = time.perf_counter()
+        try:
+            response = session.post(url, headers=headers, json=payload, timeout=(connect_timeout, read_timeout),
+                                    stream=stream)
+        except (requests.exceptions.ConnectionError, requests.exceptions.Timeout) as e:
+            stats.record(url, time.perf_counter() - start, ok=False)
+            delay = backoff_delay(attempt, backoff_base)
+            if attempt == max_retries or _past_deadline(give_up_at, delay):
+                raise
+            logger.warning(f"Request to {url} failed ({e}); retrying in {delay:.1f}s")
+            time.sleep(delay)
+            continue
+
+        elapsed = time.perf_counter() - start
+        stats.record(url, elapsed, ok=response.ok)
+        logger.info(f"POST {url} -> {response.status_code} in {elapsed:.2f}s (attempt {attempt + 1})")
+
+        if response.status_code in RETRY_STATUS_CODES and attempt < max_retries:
+            requested = response.headers.get("Retry-After") or _estimated_time(response)
+            delay = backoff_delay(attempt, backoff_base, requested)
+            if not _past_deadline(give_up_at, delay):
+                logger.warning(f"{url} returned {response.status_code}; retrying in {delay:.1f}s")
+                response.close()
+                time.sleep(delay)
+                continue
+
+        if not response.ok:
+            response.close()
+        response.raise_for_status()
+        return response
+
+def _past_deadline(give_up_at, delay):
+    return give_up_at is not None and time.monotonic() + delay >= give_up_at
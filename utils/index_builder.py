@@ -0,0 +1,146 @@
+import math
+
+import faiss
+import numpy as np
+
+from config import FAISS_INDEX_SPEC, FAISS_TRAIN_SAMPLE_SIZE, INDEX_LOAD_MMAP
+from utils.logger import setup_logger
+
+logger = setup_logger()
+
+INDEX_TYPES = ("flat", "ivf-flat", "ivf-pq", "hnsw")
+
+def parse_index_spec(spec=FAISS_INDEX_SPEC):
+    """
+    Parses an index spec such as "ivf-pq:nlist=256,m=16,nbits=8" into (index_type, params).
+    """
+    index_type, _, raw_params = spec.strip().lower().partition(":")
+    if index_type not in INDEX_TYPES:
+        raise ValueError(f"Unknown index type '{index_type}'. Expected one of: {', '.join(INDEX_TYPES)}.")
+    params = {}
+    for item in filter(None, (part.strip() for part in raw_params.split(","))):
+        key, separator, value = item.partition("=")
+        if not separator:
+            raise ValueError(f"Invalid index parameter '{item}' in spec '{spec}'. Expected key=value.")
+        params[key.strip()] = int(value)
+    return index_type, params
+
+def needs_training(spec=FAISS_INDEX_SPEC):
+    """
+    Returns True if the index type has to be trained before vectors are added.
+    """
+    return parse_index_spec(spec)[0] in ("ivf-flat", "ivf-pq")
+
+def create_index(dimension, spec=FAISS_INDEX_SPEC, num_vectors=None):
+    """
+    Creates an empty (untrained) FAISS index for the given spec.
+    num_vectors, the expected corpus size, picks a default nlist for IVF indices.
+    """
+    index_type, params = parse_index_spec(spec)
+    if index_type == "flat":
+        return faiss.IndexFlatL2(dimension)
+
+    if index_type == "hnsw":
+        index = faiss.IndexHNSWFlat(dimension, params.get("m", 32))
+        index.hnsw.efConstruction = params.get("ef_construction", 200)
+        index.hnsw.efSearch = params.get("ef_search", 64)
+        return index
+
+    # Rule of thumb: about 4 * sqrt(N) inverted lists
+    default_nlist = max(1, int(4 * math.sqrt(num_vectors))) if num_vectors else 256
+    nlist = params.get("nlist", default_nlist)
+    if index_type == "ivf-flat":
+        index = faiss.index_factory(dimension, f"IVF{nlist},Flat")
+    else:
+        m = params.get("m", 16)
+        if dimension % m:
+            raise ValueError(f"PQ sub-quantizer count m={m} must divide the embedding dimension {dimension}.")
+        index = faiss.index_factory(dimension, f"IVF{nlist},PQ{m}x{params.get('nbits', 8)}")
+    index.nprobe = params.get("nprobe", min(nlist, 16))
+    return index
+
+def create_id_index(dimension, spec=FAISS_INDEX_SPEC, num_vectors=None):
+    """
+    Creates an empty index that stores caller-assigned ids, so vectors can later be removed by id.
+    IVF indices keep ids natively; other types are wrapped in an IndexIDMap2.
+    """
+    index = create_index(dimension, spec, num_vectors)
+    if faiss.try_extract_index_ivf(index) is not None:
+        return index
+    return faiss.IndexIDMap2(index)
+
+def supports_removal(index):
+    """
+    Returns True if vectors can be removed from the index by id (HNSW graphs cannot).
+    """
+    inner = index.index if isinstance(index, faiss.IndexIDMap) else index
+    return not hasattr(inner, "hnsw")
+
+def train_index(index, sample):
+    """
+    Trains an index on a sample of vectors, raising ValueError when the sample is too small
+    for the requested number of lists or PQ centroids.
+    """
+    if index.is_trained:
+        return index
+    sample = np.ascontiguousarray(sample, dtype="float32")
+    ivf = faiss.extract_index_ivf(index)
+    if ivf.nlist > len(sample):
+        raise ValueError(
+            f"Cannot train {ivf.nlist} IVF lists on {len(sample)} vectors; lower nlist in the index spec."
+        )
+    pq = getattr(faiss.try_extract_index_ivf(index), "pq", None)
+    if pq is not None and 2 ** pq.nbits > len(sample):
+        raise ValueError(
+            f"Cannot train {2 ** pq.nbits} PQ centroids on {len(sample)} vectors; lower nbits in the index spec."
+        )
+    index.train(sample)
+    return index
+
+def sample_for_training(embeddings, sample_size=FAISS_TRAIN_SAMPLE_SIZE, seed=0):
+    """
+    Returns a random subset of at most sample_size rows to train on.
+    """
+    if len(embeddings) <= sample_size:
+        return embeddings
+    rows = np.random.default_rng(seed).choice(len(embeddings), sample_size, replace=False)
+    return embeddings[np.sort(rows)]
+
+def build_index(embeddings, spec=FAISS_INDEX_SPEC, sample_size=FAISS_TRAIN_SAMPLE_SIZE):
+    """
+    Builds an index of the given spec over embeddings, training it on a sample first when required.
+    """
+    embeddings = np.ascontiguousarray(embeddings, dtype="float32")
+    index = create_index(embeddings.shape[1], spec, num_vectors=len(embeddings))
+    if not index.is_trained:
+        train_index(index, sample_for_training(embeddings, sample_size))
+    index.add(embeddings)
+    logger.info(f"Built '{spec}' index with {index.ntotal} vectors")
+    return index
+
+def describe_index(index):
+    """
+    Returns a short human readable description of an index, including its search parameters.
+    """
+    ivf = faiss.try_extract_index_ivf(index)
+    if ivf is not None:
+        return f"{type(index).__name__}(nlist={ivf.nlist}, nprobe={ivf.nprobe}, ntotal={index.ntotal})"
+    if hasattr(index, "hnsw"):
+        return f"{type(index).__name__}(efSearch={index.hnsw.efSearch}, ntotal={index.ntotal})"
+    return f"{type(index).__name__}(ntotal={index.ntotal})"
+
+def load_index(path, mmap=INDEX_LOAD_MMAP):
+    """
+    Loads a FAISS index of any type written by the index tools.
+    Search parameters such as nprobe and efSearch are stored with the index.
+
+    With mmap=True the index is memory-mapped read-only, so worker processes share the
+    page cache instead of each holding a private copy. Such an index must not be modified.
+    """
+    io_flags = 0
+    if mmap:
+        # IO_FLAG_MMAP_IFC also maps flat code arrays (IndexFlat*), not just inverted lists
+        io_flags = getattr(faiss, "IO_FLAG_MMAP_IFC", faiss.IO_FLAG_MMAP) | faiss.IO_FLAG_READ_ONLY
+    index = faiss.read_index(path, io_flags)
+    logger.info(f"Loaded FAISS index {path}{' (memory-mapped)' if mmap else ''}: {describe_index(index)}")
+    return index
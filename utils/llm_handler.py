@@ -1,41 +1,102 @@
-from config import HUGGINGFACE_API_KEY
+from config import (
+    HUGGINGFACE_API_KEY,
+    HTTP_CONNECT_TIMEOUT,
+    HTTP_READ_TIMEOUT,
+    LLM_REQUEST_DEADLINE,
+    LLM_MAX_CONCURRENT_REQUESTS,
+    LLM_QUEUE_TIMEOUT,
+)
+import json
+from contextlib import contextmanager
 import PyPDF2
-from sentence_transformers import SentenceTransformer
 import numpy as np
 import faiss
 import requests
 
-from utils import logger
+from utils.http_client import get_session, post_json, post_stream
+from utils.logger import setup_logger
+from utils.metrics import metrics
+from utils.embedding_model import encode
+from utils.query_cache import encode_query
+from utils.single_flight import FairLimiter, SingleFlight
 
-embedding_model = SentenceTransformer('all-MiniLM-L6-v2')
+logger = setup_logger()
 
-def query_llm(model_name, question, context):
+# Shared by every session in the process: identical in-flight prompts share one upstream request,
+# and upstream requests are limited to LLM_MAX_CONCURRENT_REQUESTS, served round-robin per session
+llm_flights = SingleFlight()
+llm_limiter = FairLimiter(LLM_MAX_CONCURRENT_REQUESTS)
+
+def build_prompt(question, context):
     """
-    Queries the Hugging Face Inference API with a question and context for generating a conversational response.
+    Builds the HR assistant prompt for a question and its retrieved context.
     """
-    prompt = (
+    return (
         f"You are a friendly and helpful HR assistant. Use the following context to answer the question:\n\n"
         f"Context: {context}\n\n"
         f"Question: {question}\n\n"
         f"Answer:"
     )
-    return query_llm_inference_api(model_name, prompt)
 
-def query_llm_inference_api(model_name, prompt):
+def query_llm(model_name, question, context, session_id=None):
+    """
+    Queries the Hugging Face Inference API with a question and context for generating a conversational response.
+    Concurrent calls with the same model and prompt share one request.
     """
-    Queries the Hugging Face Inference API with a prompt.
+    prompt = build_prompt(question, context)
+
+    def run():
+        with _llm_slot(session_id):
+            return query_llm_inference_api(model_name, prompt)
+
+    return llm_flights.do((model_name, prompt), run)
+
+def query_llm_stream(model_name, question, context, session_id=None):
     """
+    Streaming version of query_llm: yields the response text token by token.
+    Streams are not coalesced, but hold a concurrency slot until they finish or are closed.
+    """
+    with _llm_slot(session_id):
+        yield from query_llm_inference_api_stream(model_name, build_prompt(question, context))
+
+@contextmanager
+def _llm_slot(session_id):
+    try:
+        with metrics.span("llm_queue_wait"):
+            llm_limiter.acquire(session_id, timeout=LLM_QUEUE_TIMEOUT)
+    except TimeoutError as e:
+        raise RuntimeError(f"Too many concurrent LLM requests: {e}")
+    try:
+        yield
+    finally:
+        llm_limiter.release()
+
+def _inference_api_url(model_name):
     # Use the model_name directly if it's a full URL
-    api_url = model_name if model_name.startswith("http") else f"https://api-inference.huggingface.co/models/{model_name}"
+    return model_name if model_name.startswith("http") else f"https://api-inference.huggingface.co/models/{model_name}"
+
+def query_llm_inference_api(model_name, prompt):
+    """
+    Queries the Hugging Face Inference API with a prompt over the shared pooled session.
+    Requests time out, and 429/503 responses are retried until LLM_REQUEST_DEADLINE.
+    """
+    api_url = _inference_api_url(model_name)
     headers = {"Authorization": f"Bearer {HUGGINGFACE_API_KEY}"}
     payload = {"inputs": prompt}
 
     try:
-        response = requests.post(api_url, headers=headers, json=payload)
-        response.raise_for_status()  # Raise an error for bad status codes
+        with metrics.span("llm_request"):
+            result = post_json(
+                get_session(),
+                api_url,
+                payload,
+                headers=headers,
+                timeout=(HTTP_CONNECT_TIMEOUT, HTTP_READ_TIMEOUT),
+                deadline=LLM_REQUEST_DEADLINE,
+            )
 
         # Extract only the generated text
-        generated_text = response.json()[0].get("generated_text", "").strip()
+        generated_text = result[0].get("generated_text", "").strip()
 
         # Remove the prompt from the response if it is included
         if prompt in generated_text:
@@ -46,9 +107,57 @@ def query_llm_inference_api(model_name, prompt):
         raise RuntimeError(f"HTTP error occurred: {http_err}")
     except requests.exceptions.RequestException as req_err:
         raise RuntimeError(f"Request error occurred: {req_err}")
-    except KeyError:
+    except (KeyError, IndexError, TypeError, AttributeError, ValueError):
         raise RuntimeError("Unexpected response format from Hugging Face API.")
 
+def query_llm_inference_api_stream(model_name, prompt):
+    """
+    Queries the Hugging Face Inference API with stream enabled and yields generated tokens as they arrive.
+
+    The API answers with server-sent events, one `data:{"token": {"text": ...}}` line per token.
+    If the endpoint ignores the stream option and returns plain JSON, the whole text is yielded at once.
+    """
+    api_url = _inference_api_url(model_name)
+    headers = {"Authorization": f"Bearer {HUGGINGFACE_API_KEY}", "Accept": "text/event-stream"}
+    payload = {"inputs": prompt, "stream": True}
+
+    try:
+        # Time until the response headers arrive, including retries
+        with metrics.span("llm_stream_open"):
+            response = post_stream(
+                get_session(),
+                api_url,
+                payload,
+                headers=headers,
+                timeout=(HTTP_CONNECT_TIMEOUT, HTTP_READ_TIMEOUT),
+                deadline=LLM_REQUEST_DEADLINE,
+            )
+    except requests.exceptions.HTTPError as http_err:
+        raise RuntimeError(f"HTTP error occurred: {http_err}")
+    except requests.exceptions.RequestException as req_err:
+        raise RuntimeError(f"Request error occurred: {req_err}")
+
+    with response:
+        try:
+            if "text/event-stream" not in response.headers.get("Content-Type", ""):
+                generated_text = response.json()[0].get("generated_text", "").strip()
+                yield generated_text.replace(prompt, "").strip() if prompt in generated_text else generated_text
+                return
+
+            for line in response.iter_lines(decode_unicode=True):
+                if not line or not line.startswith("data:"):
+                    continue  # Blank separators, comments and other SSE fields
+                event = json.loads(line[len("data:"):])
+                if "error" in event:
+                    raise RuntimeError(f"Streaming error from Hugging Face API: {event['error']}")
+                token = event.get("token") or {}
+                if token.get("text") and not token.get("special"):
+                    yield token["text"]
+        except requests.exceptions.RequestException as req_err:
+            raise RuntimeError(f"Request error occurred: {req_err}")
+        except (KeyError, IndexError, TypeError, AttributeError, ValueError):
+            raise RuntimeError("Unexpected response format from Hugging Face API.")
+
 def classify_intent(user_input, intent_model):
     """
     Classifies the intent of the user input using a text-classification model.
@@ -80,7 +189,7 @@ def create_pdf_embeddings(pdf_text):
     """
     try:
         sentences = pdf_text.split("\n")
-        embeddings = embedding_model.encode(sentences)
+        embeddings = encode(sentences)
         return sentences, embeddings
     except Exception as e:
         raise RuntimeError(f"Error creating PDF embeddings: {e}")
@@ -90,7 +199,7 @@ def search_pdf_context(query, combined_index, combined_sentences, top_k=3):
     Searches the combined FAISS index for the most relevant sentences.
     """
     try:
-        query_embedding = embedding_model.encode([query])
+        query_embedding = encode_query(query)
         _, indices = combined_index.search(query_embedding, top_k)
         best_matches = [combined_sentences[idx] for idx in indices[0]]
         return " ".join(best_matches)  # Combine the top-k sentences into a single context
@@ -1,11 +1,143 @@
+import atexit
+import json
 import logging
 import os
+import queue
+import threading
 from datetime import datetime
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler, TimedRotatingFileHandler
 
-def setup_logger(name="NEXA_HR_Chatbot", log_dir="logs", level=logging.INFO):
+from config import (
+    LOG_DIR,
+    LOG_LEVEL,
+    LOG_JSON,
+    LOG_MAX_BYTES,
+    LOG_BACKUP_COUNT,
+    LOG_ROTATE_WHEN,
+    LOG_QUEUE_SIZE,
+    LOG_MAX_MESSAGE_CHARS,
+)
+from utils.metrics import TraceIdFilter
+
+TEXT_FORMAT = "%(asctime)s - %(levelname)s - [%(trace_id)s] %(message)s"
+CONSOLE_FORMAT = "%(levelname)s - [%(trace_id)s] %(message)s"
+
+class JsonFormatter(logging.Formatter):
+    """
+    Formats each record as one JSON object per line.
+    """
+
+    def format(self, record):
+        entry = {
+            "time": self.formatTime(record),
+            "level": record.levelname,
+            "logger": record.name,
+            "pid": record.process,
+            "trace_id": getattr(record, "trace_id", "-"),
+            "message": record.getMessage(),
+        }
+        if record.exc_info:
+            entry["exc_info"] = self.formatException(record.exc_info)
+        return json.dumps(entry, ensure_ascii=False)
+
+class PayloadTruncationFilter(logging.Filter):
+    """
+    Cuts messages longer than max_chars, so logging a large context or response stays cheap.
+    """
+
+    def __init__(self, max_chars=LOG_MAX_MESSAGE_CHARS):
+        super().__init__()
+        self.max_chars = max_chars
+
+    def filter(self, record):
+        message = record.getMessage()
+        if self.max_chars and len(message) > self.max_chars:
+            record.msg = f"{message[:self.max_chars]}... [truncated {len(message) - self.max_chars} chars]"
+            record.args = None
+        return True
+
+class NonBlockingQueueHandler(QueueHandler):
+    """
+    Hands records to the background writer, which is started by the first record. When the queue is
+    full the record is dropped and counted rather than making the caller wait for disk I/O.
+    """
+
+    def __init__(self, log_queue, file_args):
+        super().__init__(log_queue)
+        self.file_args = file_args
+        self.listener = None
+        self.dropped = 0
+        self._start_lock = threading.Lock()
+
+    def enqueue(self, record):
+        if self.listener is None:
+            self._start_listener()
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+    def _start_listener(self):
+        with self._start_lock:
+            if self.listener is None:
+                stream_handler = logging.StreamHandler()
+                stream_handler.setFormatter(logging.Formatter(CONSOLE_FORMAT))
+                self.listener = QueueListener(self.queue, _file_handler(*self.file_args), stream_handler)
+                self.listener.start()
+
+    def stop(self):
+        if self.listener is not None:
+            self.listener.stop()
+
+    def reset_after_fork(self):
+        # The writer thread does not survive fork(): the child gets a fresh queue and starts its own
+        # writer, with its own log file, only once it logs something
+        if self.listener is not None:
+            for handler in self.listener.handlers:
+                if isinstance(handler, logging.FileHandler):
+                    handler.close()
+        self.listener = None
+        self.queue = queue.Queue(maxsize=self.queue.maxsize)
+        self._start_lock = threading.Lock()
+
+# Queue handlers of every logger set up in this process
+_active = []
+
+def _file_handler(log_dir, name, json_format, max_bytes, backup_count, rotate_when):
+    # Each process writes its own file, so separately started apps, workers and tools never rotate
+    # a file underneath each other
+    timestamp = datetime.now().strftime("%Y-%m-%d_%H-%M-%S")
+    log_file = os.path.join(log_dir, f"{name}_{timestamp}_{os.getpid()}.log")
+    if rotate_when:
+        handler = TimedRotatingFileHandler(log_file, when=rotate_when, backupCount=backup_count, encoding="utf-8",
+                                           delay=True)
+    else:
+        handler = RotatingFileHandler(log_file, maxBytes=max_bytes, backupCount=backup_count, encoding="utf-8",
+                                      delay=True)
+    handler.setFormatter(JsonFormatter() if json_format else logging.Formatter(TEXT_FORMAT))
+    return handler
+
+def _stop_listeners():
+    # Flushes queued records on interpreter exit
+    for queue_handler in _active:
+        queue_handler.stop()
+
+def _restart_in_child():
+    for queue_handler in _active:
+        queue_handler.reset_after_fork()
+
+atexit.register(_stop_listeners)
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_restart_in_child)
+
+def setup_logger(name="NEXA_HR_Chatbot", log_dir=LOG_DIR, level=LOG_LEVEL, json_format=LOG_JSON,
+                 max_bytes=LOG_MAX_BYTES, backup_count=LOG_BACKUP_COUNT, rotate_when=LOG_ROTATE_WHEN):
     """
     Sets up a logger with the specified name, log directory, and logging level.
-    Each session will have a unique log file based on the current timestamp.
+
+    Records are put on a bounded queue and written by a background thread, so callers never wait on
+    disk I/O. Each process logs to its own file, named after its start time and pid, which rotates by size (max_bytes) or, when rotate_when is set (e.g. "midnight"),
+    by time, and can be written as JSON lines.
     """
     logger = logging.getLogger(name)
 
@@ -16,22 +148,14 @@ def setup_logger(name="NEXA_HR_Chatbot", log_dir="logs", level=logging.INFO):
     # Ensure the log directory exists
     os.makedirs(log_dir, exist_ok=True)
 
-    # Generate a unique log file name using the current timestamp
-    timestamp = datetime.now().strftime("%Y-%m-%d_%H-%M-%S")
-    log_file = os.path.join(log_dir, f"{name}_{timestamp}.log")
-
     logger.setLevel(level)
 
-    # File handler with UTF-8 encoding
-    file_handler = logging.FileHandler(log_file, encoding="utf-8")
-    file_handler.setFormatter(logging.Formatter("%(asctime)s - %(levelname)s - %(message)s"))
-
-    # Stream handler (for console output)
-    stream_handler = logging.StreamHandler()
-    stream_handler.setFormatter(logging.Formatter("%(levelname)s - %(message)s"))
-
-    # Add handlers to the logger
-    logger.addHandler(file_handler)
-    logger.addHandler(stream_handler)
+    # Filters run in the calling thread: the trace id lives in the caller's context
+    file_args = (log_dir, name, json_format, max_bytes, backup_count, rotate_when)
+    queue_handler = NonBlockingQueueHandler(queue.Queue(maxsize=LOG_QUEUE_SIZE), file_args)
+    queue_handler.addFilter(TraceIdFilter())
+    queue_handler.addFilter(PayloadTruncationFilter())
+    _active.append(queue_handler)
 
-    return logger
\ No newline at end of file
+    logger.addHandler(queue_handler)
+    return logger
@@ -0,0 +1,189 @@
+import bisect
+import contextvars
+import logging
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Upper bounds (seconds) of the latency histogram buckets, from sub-millisecond cache hits to slow LLM calls
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+# Trace id of the chat request being handled by the current thread or task
+trace_id_var = contextvars.ContextVar("trace_id", default="-")
+
+def new_trace_id():
+    return uuid.uuid4().hex[:12]
+
+@contextmanager
+def trace(trace_id=None):
+    """
+    Sets the trace id for the enclosed code. Without one, an already active trace id is kept
+    (so callers such as the API server can choose it), otherwise a new one is generated.
+    """
+    current = trace_id_var.get()
+    token = trace_id_var.set(trace_id or (current if current != "-" else new_trace_id()))
+    try:
+        yield trace_id_var.get()
+    finally:
+        trace_id_var.reset(token)
+
+class TraceIdFilter(logging.Filter):
+    """
+    Adds the current trace id to every log record as record.trace_id.
+    """
+
+    def filter(self, record):
+        record.trace_id = trace_id_var.get()
+        return True
+
+class Histogram:
+    def __init__(self, buckets=LATENCY_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)  # The last slot counts observations above every bucket
+        self.sum = 0.0
+        self.count = 0
+        self._lock = threading.Lock()
+
+    def observe(self, value):
+        slot = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            self.counts[slot] += 1
+            self.sum += value
+            self.count += 1
+
+    def snapshot(self):
+        with self._lock:
+            return list(self.counts), self.sum, self.count
+
+class MetricsRegistry:
+    """
+    Process-wide counters and latency histograms, keyed by metric name and label values.
+    Recording takes one short lock, so instrumentation can stay on in production.
+    """
+
+    def __init__(self, prefix="nexa"):
+        self.prefix = prefix
+        self._counters = {}
+        self._histograms = {}
+        self._help = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _key(name, labels):
+        return name, tuple(sorted(labels.items()))
+
+    def inc(self, name, value=1, help_text=None, **labels):
+        key = self._key(name, labels)
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + value
+            if help_text:
+                self._help.setdefault(name, help_text)
+
+    def observe(self, name, value, help_text=None, **labels):
+        key = self._key(name, labels)
+        histogram = self._histograms.get(key)
+        if histogram is None:
+            with self._lock:
+                histogram = self._histograms.setdefault(key, Histogram())
+                if help_text:
+                    self._help.setdefault(name, help_text)
+        histogram.observe(value)
+
+    @contextmanager
+    def span(self, stage, **labels):
+        """
+        Times the enclosed code into the stage_seconds histogram; failures are also counted.
+        """
+        start = time.perf_counter()
+        try:
+            yield
+        except BaseException:
+            self.inc("stage_errors_total", stage=stage, **labels)
+            raise
+        finally:
+            self.observe("stage_seconds", time.perf_counter() - start, stage=stage, **labels)
+
+    def render_prometheus(self):
+        """
+        Returns all metrics in the Prometheus text exposition format.
+        """
+        with self._lock:
+            counters = sorted(self._counters.items())
+            histograms = sorted(self._histograms.items())
+            help_texts = dict(self._help)
+
+        lines = []
+        written = set()
+
+        def header(name, kind):
+            if name not in written:
+                written.add(name)
+                if name in help_texts:
+                    lines.append(f"# HELP {self.prefix}_{name} {help_texts[name]}")
+                lines.append(f"# TYPE {self.prefix}_{name} {kind}")
+
+        for (name, labels), value in counters:
+            header(name, "counter")
+            lines.append(f"{self.prefix}_{name}{_format_labels(labels)} {value}")
+
+        for (name, labels), histogram in histograms:
+            header(name, "histogram")
+            counts, total, count = histogram.snapshot()
+            cumulative = 0
+            for bound, bucket_count in zip(histogram.buckets + (float("inf"),), counts):
+                cumulative += bucket_count
+                le = "+Inf" if bound == float("inf") else repr(bound)
+                lines.append(f"{self.prefix}_{name}_bucket{_format_labels(labels + (('le', le),))} {cumulative}")
+            lines.append(f"{self.prefix}_{name}_sum{_format_labels(labels)} {total}")
+            lines.append(f"{self.prefix}_{name}_count{_format_labels(labels)} {count}")
+        return "\n".join(lines) + "\n"
+
+    def dump(self, path):
+        """
+        Writes the Prometheus text to a file, e.g. for the node exporter's textfile collector.
+        """
+        with open(path, "w", encoding="utf-8") as file:
+            file.write(self.render_prometheus())
+
+def _escape_label(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+def _format_labels(labels):
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape_label(value)}"' for name, value in labels) + "}"
+
+# Shared by every session in the process
+metrics = MetricsRegistry()
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.split("?")[0] != "/metrics":
+            self.send_error(404)
+            return
+        body = metrics.render_prometheus().encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+_metrics_server = None
+_metrics_server_lock = threading.Lock()
+
+def start_metrics_server(port, host="127.0.0.1"):
+    """
+    Serves /metrics from a background thread. Only the first call in a process starts a server.
+    """
+    global _metrics_server
+    with _metrics_server_lock:
+        if _metrics_server is None:
+            _metrics_server = ThreadingHTTPServer((host, port), _MetricsHandler)
+            _metrics_server.daemon_threads = True
+            threading.Thread(target=_metrics_server.serve_forever, name="metrics-server", daemon=True).start()
+        return _metrics_server
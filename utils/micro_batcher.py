@@ -0,0 +1,140 @@
+import queue
+import threading
+import time
+from concurrent.futures import Future
+
+import numpy as np
+
+from config import EMBEDDING_MODEL, MICRO_BATCH_MAX_SIZE, MICRO_BATCH_MAX_WAIT_MS
+from utils.embedding_model import encode
+
+class MicroBatcher:
+    """
+    Collects items submitted from many threads and processes them together.
+
+    A background thread takes every pending item and calls process_batch(items), which must return one
+    result per item. A lone item is processed at once; when other items are pending (concurrent load),
+    it keeps collecting for up to max_wait_ms or until max_batch_size items are pending.
+    Each result (or the batch's exception) is delivered to its caller's Future.
+    """
+
+    def __init__(self, process_batch, max_batch_size=MICRO_BATCH_MAX_SIZE, max_wait_ms=MICRO_BATCH_MAX_WAIT_MS,
+                 name="micro-batcher"):
+        self.process_batch = process_batch
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000
+        self.name = name
+        self._queue = queue.SimpleQueue()
+        self._thread = None
+        self._lock = threading.Lock()
+        self.batches = 0
+        self.items = 0
+
+    def submit(self, item):
+        """
+        Queues an item and returns a Future for its result.
+        """
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name=self.name, daemon=True)
+                self._thread.start()
+        future = Future()
+        self._queue.put((item, future))
+        return future
+
+    def _collect(self):
+        batch = [self._queue.get()]
+        # Items queued while the previous batch ran are taken without waiting
+        while len(batch) < self.max_batch_size:
+            try:
+                batch.append(self._queue.get_nowait())
+            except queue.Empty:
+                break
+        if len(batch) == 1:
+            # Nothing else is pending: a lone request is dispatched at once instead of paying max_wait
+            return batch
+        deadline = time.monotonic() + self.max_wait
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self):
+        while True:
+            batch = self._collect()
+            items = [item for item, _ in batch]
+            try:
+                results = self.process_batch(items)
+            except Exception as e:
+                for _, future in batch:
+                    future.set_exception(e)
+                continue
+            self.batches += 1
+            self.items += len(batch)
+            for (_, future), result in zip(batch, results):
+                future.set_result(result)
+
+    def stats(self):
+        return {
+            "batches": self.batches,
+            "items": self.items,
+            "mean_batch_size": self.items / self.batches if self.batches else 0.0,
+        }
+
+_query_encoders = {}
+_query_encoders_lock = threading.Lock()
+
+def _query_encoder(model_name):
+    with _query_encoders_lock:
+        batcher = _query_encoders.get(model_name)
+        if batcher is None:
+            def encode_batch(queries):
+                embeddings = encode(queries, model_name=model_name)
+                return [embeddings[i:i + 1] for i in range(len(queries))]
+
+            batcher = MicroBatcher(encode_batch, name=f"query-encoder-{model_name}")
+            _query_encoders[model_name] = batcher
+        return batcher
+
+def encode_query_batched(query, model_name=EMBEDDING_MODEL):
+    """
+    Returns the (1, d) embedding for query, encoded in one batch with other threads' pending queries.
+    """
+    return _query_encoder(model_name).submit(query).result()
+
+def _search_batch(requests):
+    # Requests against the same index with the same k are answered by one search over stacked queries
+    groups = {}
+    for position, (index, queries, k) in enumerate(requests):
+        groups.setdefault((id(index), k), []).append(position)
+
+    results = [None] * len(requests)
+    for positions in groups.values():
+        index, _, k = requests[positions[0]]
+        stacked = np.vstack([requests[position][1] for position in positions])
+        distances, ids = index.search(stacked, k)
+        row = 0
+        for position in positions:
+            count = len(requests[position][1])
+            results[position] = (distances[row:row + count], ids[row:row + count])
+            row += count
+    return results
+
+search_batcher = MicroBatcher(_search_batch, name="faiss-search")
+
+def search_batched(index, queries, k):
+    """
+    index.search(queries, k), batched with other threads' pending searches on the same index.
+    """
+    queries = np.ascontiguousarray(queries, dtype="float32")
+    return search_batcher.submit((index, queries, k)).result()
+
+def batcher_stats():
+    with _query_encoders_lock:
+        encoders = {model_name: batcher.stats() for model_name, batcher in _query_encoders.items()}
+    return {"query_encoders": encoders, "search": search_batcher.stats()}
@@ -0,0 +1,90 @@
+import faiss
+import numpy as np
+
+from utils.sentence_store import SentenceStore
+
+class OverlaySentences:
+    """
+    Read-only view that concatenates the shared base sentences with a session's own sentences
+    without copying either of them.
+    """
+
+    def __init__(self, base_sentences, delta_sentences):
+        self.base_sentences = base_sentences
+        self.delta_sentences = SentenceStore.from_iterable(delta_sentences)
+        self._base_size = len(base_sentences)
+
+    def __len__(self):
+        return self._base_size + len(self.delta_sentences)
+
+    def __getitem__(self, idx):
+        idx = int(idx)
+        if idx < 0:
+            idx += len(self)
+        if 0 <= idx < self._base_size:
+            return self.base_sentences[idx]
+        if self._base_size <= idx < len(self):
+            return self.delta_sentences[idx - self._base_size]
+        raise IndexError(f"Sentence id {idx} is out of range.")
+
+    def __iter__(self):
+        for idx in range(len(self)):
+            yield self[idx]
+
+class OverlayIndex:
+    """
+    Layered FAISS index: a shared, read-only base index plus a small per-session delta index.
+
+    Ids returned by search() are positions in the matching OverlaySentences: base hits keep
+    their own ids, delta hits are offset by the size of the base sentence store.
+    """
+
+    def __init__(self, base_index, base_size=None):
+        self.base_index = base_index
+        self.base_size = base_index.ntotal if base_size is None else base_size
+        self.delta_index = None
+        self.d = base_index.d
+        self.metric_type = base_index.metric_type
+
+    @property
+    def ntotal(self):
+        delta_total = self.delta_index.ntotal if self.delta_index is not None else 0
+        return self.base_index.ntotal + delta_total
+
+    def add(self, embeddings):
+        """
+        Adds vectors to the session's delta index. The base index is never modified.
+        """
+        embeddings = np.ascontiguousarray(embeddings, dtype="float32")
+        if embeddings.size == 0:
+            return
+        if self.delta_index is None:
+            self.delta_index = faiss.IndexFlat(self.d, self.metric_type)
+        self.delta_index.add(embeddings)
+
+    def search(self, queries, k, base_search=None):
+        """
+        Searches the base and delta indices and merges their top-k results by distance.
+        base_search(queries, k) replaces base_index.search, e.g. to batch it with other sessions.
+        """
+        queries = np.ascontiguousarray(queries, dtype="float32")
+        distances, ids = (base_search or self.base_index.search)(queries, k)
+        if self.delta_index is None or self.delta_index.ntotal == 0:
+            return distances, ids
+
+        delta_distances, delta_ids = self.delta_index.search(queries, k)
+        delta_ids = np.where(delta_ids >= 0, delta_ids + self.base_size, delta_ids)
+
+        all_distances = np.concatenate([distances, delta_distances], axis=1)
+        all_ids = np.concatenate([ids, delta_ids], axis=1)
+
+        # Missing results (-1) must sort last whichever direction is "better" for the metric
+        higher_is_better = self.metric_type == faiss.METRIC_INNER_PRODUCT
+        sort_keys = -all_distances if higher_is_better else all_distances.copy()
+        sort_keys[all_ids < 0] = np.inf
+
+        order = np.argsort(sort_keys, axis=1, kind="stable")[:, :k]
+        return (
+            np.take_along_axis(all_distances, order, axis=1),
+            np.take_along_axis(all_ids, order, axis=1),
+        )
@@ -0,0 +1,209 @@
+import io
+import os
+import tempfile
+import threading
+import time
+import unicodedata
+from concurrent.futures import ProcessPoolExecutor, TimeoutError as FuturesTimeoutError
+from concurrent.futures.process import BrokenProcessPool
+
+import PyPDF2
+
+from config import PDF_EXTRACT_WORKERS, PDF_EXTRACT_TIMEOUT, PDF_EXTRACT_PAGES_PER_TASK
+from utils.logger import setup_logger
+
+logger = setup_logger()
+
+def _source_name(source):
+    if isinstance(source, (str, os.PathLike)):
+        return os.path.basename(source)
+    return getattr(source, "name", "<upload>")
+
+def _read_source(source):
+    """
+    Turns a path, bytes or file-like object into the payload sent to workers.
+    Paths are passed as-is so the file bytes are not pickled for every task.
+    """
+    if isinstance(source, (str, os.PathLike)):
+        return os.fspath(source)
+    if isinstance(source, (bytes, bytearray)):
+        return bytes(source)
+    return source.getvalue() if hasattr(source, "getvalue") else source.read()
+
+def _open_reader(payload):
+    if isinstance(payload, str):
+        with open(payload, "rb") as file:
+            return PyPDF2.PdfReader(io.BytesIO(file.read()))
+    return PyPDF2.PdfReader(io.BytesIO(payload))
+
+def _count_pages(payload):
+    """
+    Worker task: parses a PDF just far enough to count its pages.
+    """
+    return len(_open_reader(payload).pages)
+
+def _extract_page_range(payload, start, stop):
+    """
+    Worker task: extracts and NFKD-normalizes pages [start, stop) of one PDF.
+    """
+    reader = _open_reader(payload)
+    texts = []
+    for page_number in range(start, stop):
+        raw_text = reader.pages[page_number].extract_text() or ""
+        # Normalize text to replace special characters (e.g., ligatures)
+        texts.append(unicodedata.normalize("NFKD", raw_text))
+    return texts
+
+def _spill_to_file(payload):
+    # Uploaded bytes are written to a temporary file once, so tasks send its path rather than pickling
+    # the whole PDF for every page range
+    with tempfile.NamedTemporaryFile(suffix=".pdf", delete=False) as file:
+        file.write(payload)
+    return file.name
+
+# Worker pool shared by every extraction in the process, so uploads don't pay for starting processes
+_executor = None
+_executor_workers = 0
+_executor_lock = threading.Lock()
+
+def _get_executor(max_workers):
+    global _executor, _executor_workers
+    with _executor_lock:
+        if _executor is None or _executor_workers != max_workers:
+            if _executor is not None:
+                _executor.shutdown(wait=False)
+            _executor = ProcessPoolExecutor(max_workers=max_workers)
+            _executor_workers = max_workers
+        return _executor
+
+def _discard_executor(executor):
+    # A worker stuck on a malformed file (or a crashed pool) would hold up later extractions and keep the
+    # interpreter from exiting: its workers are terminated and the next call starts a fresh pool.
+    # Files other callers still had queued on it fail with BrokenProcessPool.
+    global _executor
+    with _executor_lock:
+        if _executor is executor:
+            _executor = None
+    for process in list((getattr(executor, "_processes", None) or {}).values()):
+        process.terminate()
+    executor.shutdown(wait=False, cancel_futures=True)
+
+def _wait(task, deadline):
+    remaining = None if deadline is None else max(0.0, deadline - time.monotonic())
+    return task.result(timeout=remaining)
+
+def iter_page_texts(sources, max_workers=PDF_EXTRACT_WORKERS, timeout=PDF_EXTRACT_TIMEOUT,
+                    pages_per_task=PDF_EXTRACT_PAGES_PER_TASK, skip_failed=False):
+    """
+    Extracts pages from several PDFs across a shared process pool and yields (source_index, page_number, text).
+
+    Results are yielded in source order and page order regardless of which worker finishes first.
+    A file that fails or exceeds `timeout` seconds (counting its pages included) raises RuntimeError,
+    or is logged and skipped when skip_failed is True. With max_workers <= 1 and a timeout, files are
+    extracted in a single worker process; with no timeout either, everything runs in-process.
+    """
+    # The timeout can only be enforced by abandoning (and terminating) a worker, so it needs at least one
+    executor = _get_executor(max(1, max_workers)) if max_workers > 1 or timeout else None
+    spilled = []
+    plan = []
+    scheduled = []
+    discard_pool = False
+    try:
+        # Every file is opened in a worker, counting its pages included: a malformed file cannot hang this process
+        for source in sources:
+            name = _source_name(source)
+            try:
+                payload = _read_source(source)
+                if executor is not None and isinstance(payload, bytes):
+                    payload = _spill_to_file(payload)
+                    spilled.append(payload)
+                if executor is not None:
+                    deadline = time.monotonic() + timeout if timeout else None
+                    plan.append([name, payload, executor.submit(_count_pages, payload), deadline, None])
+                else:
+                    plan.append([name, payload, None, None, None])
+            except Exception as e:
+                plan.append([name, None, None, None, e])
+                discard_pool = discard_pool or isinstance(e, BrokenProcessPool)
+
+        # Queue every file's page ranges as soon as its page count is known, so workers never sit idle between files
+        for name, payload, count_task, deadline, error in plan:
+            tasks = []
+            if error is None:
+                try:
+                    page_count = _count_pages(payload) if executor is None else _wait(count_task, deadline)
+                    ranges = [(start, min(start + pages_per_task, page_count)) for start in range(0, page_count, pages_per_task)]
+                    if executor is not None:
+                        tasks = [(start, executor.submit(_extract_page_range, payload, start, stop)) for start, stop in ranges]
+                    else:
+                        tasks = ranges
+                except FuturesTimeoutError:
+                    error = TimeoutError(f"extraction took longer than {timeout}s")
+                    discard_pool = True
+                except Exception as e:
+                    error = e
+                    discard_pool = discard_pool or isinstance(e, BrokenProcessPool)
+            scheduled.append((name, payload, error, tasks))
+
+        for source_index, (name, payload, error, tasks) in enumerate(scheduled):
+            pages = []
+            if error is None:
+                deadline = time.monotonic() + timeout if timeout else None
+                try:
+                    for start, task in tasks:
+                        if executor is None:
+                            pages.extend(_extract_page_range(payload, start, task))
+                        else:
+                            pages.extend(_wait(task, deadline))
+                except FuturesTimeoutError:
+                    error = TimeoutError(f"extraction took longer than {timeout}s")
+                    discard_pool = True
+                except Exception as e:
+                    error = e
+                    discard_pool = discard_pool or isinstance(e, BrokenProcessPool)
+
+            if error is not None:
+                if executor is not None:
+                    for _, task in tasks:
+                        task.cancel()
+                if not skip_failed:
+                    raise RuntimeError(f"Error extracting text from PDF {name}: {error}")
+                logger.warning(f"Skipping PDF {name}: {error}")
+                continue
+
+            for page_number, text in enumerate(pages):
+                yield source_index, page_number, text
+    finally:
+        if executor is not None:
+            # Tasks of this call that are no longer needed (e.g. the caller stopped early) are dropped
+            for _, _, count_task, _, _ in plan:
+                if count_task is not None:
+                    count_task.cancel()
+            for _, _, _, tasks in scheduled:
+                for _, task in tasks:
+                    task.cancel()
+            if discard_pool:
+                _discard_executor(executor)
+        for path in spilled:
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+def extract_pages(sources, **kwargs):
+    """
+    Extracts each PDF in sources as a list of page texts, returned in the same order.
+    Files skipped because of errors come back as empty lists.
+    """
+    sources = list(sources)
+    pages_by_source = [[] for _ in sources]
+    for source_index, _, text in iter_page_texts(sources, **kwargs):
+        pages_by_source[source_index].append(text)
+    return pages_by_source
+
+def extract_texts(sources, **kwargs):
+    """
+    Extracts the full text of each PDF in sources, returned in the same order.
+    Files skipped because of errors come back as empty strings.
+    """
+    return ["".join(pages) for pages in extract_pages(sources, **kwargs)]
@@ -1,73 +1,140 @@
-import PyPDF2
-from sentence_transformers import SentenceTransformer
+import io
 import numpy as np
-import faiss
-import unicodedata
+from config import EMBEDDING_BATCH_SIZE, BOILERPLATE_MIN_PAGE_FRACTION, CHUNK_MERGE_TARGET_CHARS, MICRO_BATCH_ENABLED
+from utils.embedding_model import encode
+from utils.query_cache import encode_query
 from utils.logger import setup_logger
+from utils.metrics import metrics
+from utils.micro_batcher import search_batched
+from utils.pdf_extraction import extract_pages, extract_texts
+from utils.overlay_index import OverlayIndex, OverlaySentences
+from utils.streaming_index import build_index_streaming
+from utils.text_chunker import chunk_documents, removed_count
+from utils.upload_cache import file_content_hash, upload_cache
 
 logger = setup_logger()
 
-embedding_model = SentenceTransformer('all-MiniLM-L6-v2')
-
 def extract_text_from_pdf(uploaded_file):
     """
     Extract text from a single PDF file and normalize it to handle special characters.
+    Pages are extracted in parallel worker processes.
     """
-    try:
-        pdf_reader = PyPDF2.PdfReader(uploaded_file)
-        text = ""
-        for page in pdf_reader.pages:
-            raw_text = page.extract_text()
-            # Normalize text to replace special characters (e.g., ligatures)
-            normalized_text = unicodedata.normalize("NFKD", raw_text)
-            text += normalized_text
-        return text
-    except Exception as e:
-        raise RuntimeError(f"Error extracting text from PDF: {e}")
+    return extract_texts([uploaded_file])[0]
 
 def handle_multiple_pdfs(uploaded_files):
     """
     Process multiple PDF files and return the combined text.
     """
-    all_text = ""
-    for uploaded_file in uploaded_files:
-        try:
-            text = extract_text_from_pdf(uploaded_file)
-            if text.strip():
-                all_text += text + "\n"
-        except Exception as e:
-            raise RuntimeError(f"Error processing file {uploaded_file.name}: {e}")
-    return all_text
+    texts = extract_texts(uploaded_files)
+    return "".join(text + "\n" for text in texts if text.strip())
 
-def create_pdf_embeddings(pdf_text):
+def create_pdf_embeddings(pdf_text, index=None, batch_size=EMBEDDING_BATCH_SIZE):
     """
-    Creates embeddings for the given PDF text.
+    Creates embeddings for the given PDF text (a string or an iterable of lines).
+    A string is cleaned first: blank, page-number and duplicate lines are dropped.
+    When an index is given, embeddings are added to it batch by batch and None is returned
+    in their place, so peak memory stays bounded by batch_size.
     """
-    sentences = pdf_text.split("\n")
-    embeddings = embedding_model.encode(sentences)
+    if isinstance(pdf_text, str):
+        lines, stats = chunk_documents([[pdf_text]])
+        logger.info(f"Removed {removed_count(stats)} of {stats['input_lines']} lines before embedding: {stats}")
+    else:
+        lines = pdf_text
+    if index is not None:
+        _, sentences = build_index_streaming(lines, index=index, batch_size=batch_size)
+        return sentences, None
+    sentences = list(lines)
+    embeddings = encode(sentences)
     return sentences, embeddings
 
+def process_uploaded_pdfs(uploaded_files):
+    """
+    Extracts and embeds multiple PDF files, reusing cached results for files seen before.
+    Returns the sentences and embeddings of all files combined.
+    """
+    pipeline = f"chunk:{BOILERPLATE_MIN_PAGE_FRACTION}:{CHUNK_MERGE_TARGET_CHARS}"
+    results = [None] * len(uploaded_files)
+    missing = []
+    for position, uploaded_file in enumerate(uploaded_files):
+        data = uploaded_file.getvalue() if hasattr(uploaded_file, "getvalue") else uploaded_file.read()
+        content_hash = file_content_hash(data)
+        cached = upload_cache.get(content_hash, pipeline=pipeline)
+        if cached is not None:
+            logger.info(f"Upload cache hit for {uploaded_file.name}")
+            results[position] = cached
+        else:
+            buffer = io.BytesIO(data)
+            buffer.name = uploaded_file.name
+            missing.append((position, uploaded_file.name, content_hash, buffer))
+
+    # Only files that are not cached are parsed, all of them in one parallel batch
+    pages_by_file = extract_pages([buffer for _, _, _, buffer in missing])
+    for (position, name, content_hash, _), pages in zip(missing, pages_by_file):
+        chunks, stats = chunk_documents([pages])
+        logger.info(f"Removed {removed_count(stats)} of {stats['input_lines']} lines from {name}: {stats}")
+        if not chunks:
+            continue
+        try:
+            sentences, embeddings = create_pdf_embeddings(chunks)
+        except Exception as e:
+            raise RuntimeError(f"Error processing file {name}: {e}")
+        upload_cache.put(content_hash, sentences, embeddings, pipeline=pipeline)
+        results[position] = (sentences, embeddings)
+
+    all_sentences = []
+    all_embeddings = []
+    for result in results:
+        if result is not None:
+            all_sentences.extend(result[0])
+            all_embeddings.append(result[1])
+
+    if not all_embeddings:
+        return [], np.empty((0, 0), dtype="float32")
+    return all_sentences, np.vstack(all_embeddings).astype("float32", copy=False)
+
 def search_pdf_context(query, combined_index, combined_sentences, top_k=3):
     """
     Searches the combined FAISS index for the most relevant sentences.
     """
+    return retrieve_pdf_context(query, combined_index, combined_sentences, top_k)[0]
+
+def _search(index, queries, k):
+    # The shared pre-trained index is searched in batches across sessions; each session's own
+    # uploaded vectors are searched directly
+    if not MICRO_BATCH_ENABLED:
+        return index.search(queries, k)
+    if isinstance(index, OverlayIndex):
+        return index.search(queries, k, base_search=lambda q, k: search_batched(index.base_index, q, k))
+    return search_batched(index, queries, k)
+
+def retrieve_pdf_context(query, combined_index, combined_sentences, top_k=3):
+    """
+    Like search_pdf_context, but returns (context, query_embedding, ids) so callers can reuse the
+    query embedding and know which sentences the context was built from.
+    """
     try:
-        query_embedding = embedding_model.encode([query])
-        _, indices = combined_index.search(query_embedding, top_k)
-        best_matches = [combined_sentences[idx] for idx in indices[0] if idx < len(combined_sentences)]
-        logger.info(f"Query: {query}")
-        logger.info(f"Retrieved context: {best_matches}")
-        return " ".join(best_matches) if best_matches else "No relevant context found."
+        with metrics.span("encode_query"):
+            query_embedding = encode_query(query)
+        with metrics.span("faiss_search"):
+            _, indices = _search(combined_index, query_embedding, top_k)
+        ids = [int(idx) for idx in indices[0] if 0 <= idx < len(combined_sentences)]
+        best_matches = [combined_sentences[idx] for idx in ids]
+        # Full payloads only at DEBUG, formatted lazily so the request path does not pay for them
+        logger.info(f"Retrieved {len(ids)} sentences for a {len(query)}-character query")
+        logger.debug("Query: %s | retrieved context: %s", query, best_matches)
+        if not best_matches:
+            return "No relevant context found.", query_embedding, []
+        return " ".join(best_matches), query_embedding, ids
     except Exception as e:
         logger.error(f"Error searching FAISS index: {e}")
-        return "No relevant context found."
+        return "No relevant context found.", None, []
 
 def combine_indices(pretrained_index, pretrained_sentences, user_embeddings, user_sentences):
     """
-    Combines pre-trained FAISS index with user-uploaded embeddings.
+    Layers user-uploaded embeddings over the pre-trained FAISS index.
+    The pre-trained index and sentences are shared, not copied; only the user's vectors are added.
     """
-    combined_index = faiss.IndexFlatL2(pretrained_index.d)
-    combined_index.add(pretrained_index.reconstruct_n(0, pretrained_index.ntotal))
+    combined_index = OverlayIndex(pretrained_index, base_size=len(pretrained_sentences))
     combined_index.add(user_embeddings)
-    combined_sentences = np.concatenate([pretrained_sentences, user_sentences])
+    combined_sentences = OverlaySentences(pretrained_sentences, user_sentences)
     return combined_index, combined_sentences
\ No newline at end of file
@@ -0,0 +1,94 @@
+import threading
+import time
+import unicodedata
+from collections import OrderedDict
+
+import numpy as np
+
+from config import EMBEDDING_MODEL, MICRO_BATCH_ENABLED, QUERY_EMBEDDING_CACHE_SIZE, QUERY_EMBEDDING_CACHE_TTL
+from utils.embedding_model import encode
+from utils.micro_batcher import encode_query_batched
+
+def normalize_query(query):
+    """
+    Normalizes a query so that trivially different spellings share a cache entry.
+    """
+    normalized = unicodedata.normalize("NFKC", query).casefold()
+    return " ".join(normalized.split())
+
+class QueryEmbeddingCache:
+    """
+    Bounded, thread-safe LRU cache of query embeddings keyed by (model name, normalized query).
+    """
+
+    def __init__(self, max_size=QUERY_EMBEDDING_CACHE_SIZE, ttl=QUERY_EMBEDDING_CACHE_TTL):
+        self.max_size = max_size
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            vector, stored_at = entry
+            if self.ttl is not None and time.monotonic() - stored_at > self.ttl:
+                del self._entries[key]
+                self.evictions += 1
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return vector
+
+    def put(self, key, vector):
+        if self.max_size <= 0:
+            return
+        # Cached vectors are shared between callers, so make sure nobody mutates them
+        vector = np.array(vector, dtype="float32", copy=True)
+        vector.setflags(write=False)
+        with self._lock:
+            self._entries[key] = (vector, time.monotonic())
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._entries),
+                "max_size": self.max_size,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+            }
+
+# Shared by every session in the process
+query_embedding_cache = QueryEmbeddingCache()
+
+def encode_query(query, model_name=EMBEDDING_MODEL, cache=query_embedding_cache):
+    """
+    Returns the (1, d) embedding for query, skipping the encoder when it is cached.
+    Cache misses are encoded together with other sessions' pending queries when micro-batching is on.
+    """
+    key = (model_name, normalize_query(query))
+    vector = cache.get(key)
+    if vector is None:
+        if MICRO_BATCH_ENABLED:
+            vector = encode_query_batched(query, model_name=model_name)
+        else:
+            vector = encode([query], model_name=model_name)
+        cache.put(key, vector)
+    return vector
@@ -0,0 +1,156 @@
+import os
+import threading
+import time
+import weakref
+
+from utils.index_builder import load_index
+from utils.logger import setup_logger
+from utils.sentence_store import load_sentences
+
+logger = setup_logger()
+
+def file_version(path):
+    """
+    Identifies one version of a file on disk by its path and modification time.
+    """
+    return os.path.abspath(path), os.stat(path).st_mtime_ns
+
+def estimate_index_bytes(index):
+    """
+    Approximate memory held by a FAISS index's stored vectors.
+    """
+    code_size = getattr(index, "code_size", None) or index.d * 4
+    return index.ntotal * code_size
+
+class ResourceHandle:
+    """
+    A session's reference to a shared resource. The reference is released when the handle
+    is released explicitly or garbage collected together with the session state.
+    """
+
+    def __init__(self, cache, key, value):
+        self.key = key
+        self.value = value
+        self._finalizer = weakref.finalize(self, cache._release, key)
+
+    def release(self):
+        self._finalizer()
+
+    @property
+    def released(self):
+        return not self._finalizer.alive
+
+class SharedResourceCache:
+    """
+    Process-wide, reference-counted cache of read-only resources such as the pre-trained index.
+
+    Entries are keyed by (kind, file versions), so a rebuilt file is loaded once as a new entry
+    while sessions still holding the old version keep it alive until they release it.
+    """
+
+    def __init__(self):
+        self._entries = {}
+        self._current = {}
+        self._lock = threading.Lock()
+
+    def acquire(self, kind, paths, loader, sizer=None):
+        """
+        Returns a handle to the resource built by loader(*paths), loading it only if no
+        session in this process already holds the same version of those files.
+        """
+        key = (kind,) + tuple(file_version(path) for path in paths)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                entry = {"value": None, "refcount": 0, "nbytes": 0, "load_seconds": 0.0, "ready": threading.Event()}
+                self._entries[key] = entry
+                owner = True
+            else:
+                owner = False
+            entry["refcount"] += 1
+            previous = self._current.get(kind)
+            self._current[kind] = key
+
+        if owner:
+            try:
+                start = time.perf_counter()
+                entry["value"] = loader(*paths)
+                entry["load_seconds"] = time.perf_counter() - start
+                entry["nbytes"] = sizer(entry["value"]) if sizer else 0
+                logger.info(f"Loaded shared {kind} in {entry['load_seconds']:.2f}s ({entry['nbytes']} bytes)")
+            except Exception:
+                with self._lock:
+                    self._entries.pop(key, None)
+                raise
+            finally:
+                entry["ready"].set()
+        else:
+            entry["ready"].wait()
+            if entry["value"] is None:
+                raise RuntimeError(f"Loading shared {kind} failed in another session.")
+
+        if previous is not None and previous != key:
+            self._evict_if_unused(previous)
+        return ResourceHandle(self, key, entry["value"])
+
+    def _release(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return
+            entry["refcount"] -= 1
+        self._evict_if_unused(key)
+
+    def _evict_if_unused(self, key):
+        # The current version stays cached with no references so the next session starts warm
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry["refcount"] <= 0 and self._current.get(key[0]) != key:
+                del self._entries[key]
+                logger.info(f"Evicted stale shared {key[0]}")
+
+    def stats(self):
+        """
+        Returns memory accounting for every shared entry.
+        """
+        with self._lock:
+            return [
+                {
+                    "kind": key[0],
+                    "files": [path for path, _ in key[1:]],
+                    "refcount": entry["refcount"],
+                    "nbytes": entry["nbytes"],
+                    "load_seconds": entry["load_seconds"],
+                    "current": self._current.get(key[0]) == key,
+                }
+                for key, entry in self._entries.items()
+            ]
+
+    def shared_bytes(self):
+        return sum(entry["nbytes"] for entry in self.stats())
+
+shared_resources = SharedResourceCache()
+
+def _load_training_data(index_path, sentences_path):
+    return load_index(index_path), load_sentences(sentences_path)
+
+def _training_data_bytes(value):
+    index, sentences = value
+    return estimate_index_bytes(index) + sentences.nbytes
+
+def acquire_training_data(index_path, sentences_path, cache=shared_resources):
+    """
+    Returns a handle whose value is the shared (index, sentences) pair for the pre-trained data.
+    """
+    return cache.acquire("training_data", (index_path, sentences_path), _load_training_data, _training_data_bytes)
+
+def session_bytes(combined_index, combined_sentences):
+    """
+    Memory a session holds on top of the shared resources (its uploaded vectors and sentences).
+    """
+    delta_index = getattr(combined_index, "delta_index", None)
+    delta_sentences = getattr(combined_sentences, "delta_sentences", None)
+    total = estimate_index_bytes(delta_index) if delta_index is not None else 0
+    if delta_sentences is not None:
+        total += delta_sentences.nbytes
+    return total
@@ -0,0 +1,150 @@
+import os
+import struct
+import uuid
+
+import numpy as np
+
+from config import INDEX_LOAD_MMAP
+from utils.logger import setup_logger
+
+logger = setup_logger()
+
+# File layout: header, (count + 1) little-endian uint64 offsets, then the UTF-8 bytes of every sentence
+STORE_MAGIC = b"NXSS"
+STORE_VERSION = 1
+HEADER = struct.Struct("<4sIQQ")  # magic, version, sentence count, buffer length
+
+class SentenceStore:
+    """
+    Compact sentence store: one contiguous UTF-8 buffer plus a uint64 offsets array.
+
+    Lookup by id is O(1). Sentences appended after loading live in a separate growable tail,
+    so a memory-mapped store is never copied or modified.
+    """
+
+    def __init__(self, buffer=b"", offsets=None):
+        self._buffer = buffer
+        self._offsets = np.zeros(1, dtype="<u8") if offsets is None else offsets
+        self._base_count = len(self._offsets) - 1
+        self._tail = bytearray()
+        self._tail_offsets = [0]
+
+    @classmethod
+    def from_iterable(cls, sentences):
+        store = cls()
+        store.extend(sentences)
+        return store
+
+    def __len__(self):
+        return self._base_count + len(self._tail_offsets) - 1
+
+    def __getitem__(self, idx):
+        idx = int(idx)
+        if idx < 0:
+            idx += len(self)
+        if 0 <= idx < self._base_count:
+            start, end = int(self._offsets[idx]), int(self._offsets[idx + 1])
+            return bytes(self._buffer[start:end]).decode("utf-8")
+        tail_idx = idx - self._base_count
+        if 0 <= tail_idx < len(self._tail_offsets) - 1:
+            start, end = self._tail_offsets[tail_idx], self._tail_offsets[tail_idx + 1]
+            return self._tail[start:end].decode("utf-8")
+        raise IndexError(f"Sentence id {idx} is out of range.")
+
+    def __iter__(self):
+        for idx in range(len(self)):
+            yield self[idx]
+
+    def append(self, sentence):
+        self._tail += str(sentence).encode("utf-8")
+        self._tail_offsets.append(len(self._tail))
+
+    def extend(self, sentences):
+        for sentence in sentences:
+            self.append(sentence)
+
+    @property
+    def nbytes(self):
+        """
+        Bytes held by the buffers and offsets (mapped pages included).
+        """
+        return len(self._buffer) + self._offsets.nbytes + len(self._tail) + 8 * len(self._tail_offsets)
+
+    def save(self, path):
+        """
+        Writes the store in the versioned on-disk format. The file is replaced atomically.
+        """
+        base_bytes = int(self._offsets[-1])
+        offsets = np.concatenate([
+            self._offsets,
+            np.asarray(self._tail_offsets[1:], dtype="<u8") + base_bytes,
+        ]).astype("<u8", copy=False)
+        tmp_path = f"{path}.{uuid.uuid4().hex}.tmp"
+        with open(tmp_path, "wb") as file:
+            file.write(HEADER.pack(STORE_MAGIC, STORE_VERSION, len(self), int(offsets[-1])))
+            file.write(offsets.tobytes())
+            file.write(memoryview(self._buffer)[:base_bytes])
+            file.write(self._tail)
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path, mmap=INDEX_LOAD_MMAP):
+        """
+        Opens a store file, memory-mapping it read-only when mmap is True.
+        """
+        if mmap:
+            data = np.memmap(path, dtype="u1", mode="r")
+        else:
+            with open(path, "rb") as file:
+                data = np.frombuffer(file.read(), dtype="u1")
+        if len(data) < HEADER.size:
+            raise ValueError(f"{path} is too short to be a sentence store.")
+        magic, version, count, buffer_length = HEADER.unpack(bytes(data[:HEADER.size]))
+        if magic != STORE_MAGIC:
+            raise ValueError(f"{path} is not a sentence store.")
+        if version != STORE_VERSION:
+            raise ValueError(f"{path} uses sentence store version {version}; expected {STORE_VERSION}.")
+
+        offsets_end = HEADER.size + 8 * (count + 1)
+        if len(data) < offsets_end + buffer_length:
+            raise ValueError(f"{path} is truncated: expected {offsets_end + buffer_length} bytes, found {len(data)}.")
+        offsets = data[HEADER.size:offsets_end].view("<u8")
+        if int(offsets[-1]) != buffer_length:
+            raise ValueError(f"{path} is corrupt: its offsets end at {int(offsets[-1])}, not {buffer_length}.")
+        buffer = data[offsets_end:offsets_end + buffer_length]
+        return cls(buffer, offsets)
+
+def is_sentence_store(path):
+    """
+    Returns True if path starts with the sentence store magic bytes.
+    """
+    with open(path, "rb") as file:
+        return file.read(len(STORE_MAGIC)) == STORE_MAGIC
+
+def save_sentences(path, sentences):
+    """
+    Saves sentences as a compact sentence store.
+    """
+    store = sentences if isinstance(sentences, SentenceStore) else SentenceStore.from_iterable(sentences)
+    store.save(path)
+
+def load_sentences(path, mmap=INDEX_LOAD_MMAP):
+    """
+    Loads the training sentences saved next to the FAISS index.
+
+    Sentence stores are memory-mapped read-only when mmap is True. Legacy .npy files are still
+    readable: unicode arrays are mapped as well, pickled object arrays are loaded in full.
+    """
+    if is_sentence_store(path):
+        sentences = SentenceStore.load(path, mmap=mmap)
+        logger.info(f"Loaded {len(sentences)} training sentences from {path} ({sentences.nbytes} bytes)")
+        return sentences
+
+    if mmap:
+        try:
+            sentences = np.load(path, mmap_mode="r", allow_pickle=False)
+            logger.info(f"Memory-mapped {len(sentences)} training sentences from {path}")
+            return sentences
+        except ValueError:
+            logger.warning(f"{path} holds pickled objects and cannot be memory-mapped; loading it in full.")
+    return np.load(path, allow_pickle=True)
@@ -0,0 +1,120 @@
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future
+from contextlib import contextmanager
+
+class SingleFlight:
+    """
+    Coalesces concurrent calls with the same key: the first caller runs the function, and callers that
+    arrive while it is in flight wait for and share its result (or exception). Nothing is cached after
+    the call completes.
+    """
+
+    def __init__(self):
+        self._calls = {}
+        self._lock = threading.Lock()
+        self.calls = 0
+        self.coalesced = 0
+
+    def do(self, key, fn):
+        with self._lock:
+            future = self._calls.get(key)
+            if future is not None:
+                self.coalesced += 1
+                leader = False
+            else:
+                future = Future()
+                self._calls[key] = future
+                self.calls += 1
+                leader = True
+
+        if not leader:
+            return future.result()
+
+        try:
+            future.set_result(fn())
+        except BaseException as e:
+            future.set_exception(e)
+        finally:
+            with self._lock:
+                del self._calls[key]
+        return future.result()
+
+    def stats(self):
+        with self._lock:
+            return {"in_flight": len(self._calls), "calls": self.calls, "coalesced": self.coalesced}
+
+class FairLimiter:
+    """
+    Limits how many callers run at once. Waiting callers are queued per session and sessions are served
+    round-robin, so one session sending many requests cannot starve the others.
+    """
+
+    def __init__(self, max_concurrent):
+        self.max_concurrent = max_concurrent
+        self._condition = threading.Condition()
+        self._active = 0
+        self._queues = {}  # session -> deque of waiting tickets
+        self._rotation = deque()  # sessions with waiting tickets, in serving order
+        self.max_wait = 0.0
+
+    def _dispatch(self):
+        # Called with the condition held: grant free slots to the next session in turn
+        while self._active < self.max_concurrent and self._rotation:
+            session = self._rotation.popleft()
+            queue = self._queues[session]
+            ticket = queue.popleft()
+            ticket["granted"] = True
+            self._active += 1
+            if queue:
+                self._rotation.append(session)
+            else:
+                del self._queues[session]
+        self._condition.notify_all()
+
+    def acquire(self, session=None, timeout=None):
+        """
+        Waits for a slot; raises TimeoutError if none is granted within timeout seconds.
+        """
+        ticket = {"granted": False}
+        start = time.monotonic()
+        with self._condition:
+            if session not in self._queues:
+                self._queues[session] = deque()
+                self._rotation.append(session)
+            self._queues[session].append(ticket)
+            self._dispatch()
+
+            granted = self._condition.wait_for(lambda: ticket["granted"], timeout)
+            if not granted:
+                queue = self._queues[session]
+                queue.remove(ticket)
+                if not queue:
+                    del self._queues[session]
+                    self._rotation.remove(session)
+                raise TimeoutError(f"No request slot became free within {timeout}s.")
+            self.max_wait = max(self.max_wait, time.monotonic() - start)
+
+    def release(self):
+        with self._condition:
+            self._active -= 1
+            self._dispatch()
+
+    @contextmanager
+    def slot(self, session=None, timeout=None):
+        self.acquire(session, timeout)
+        try:
+            yield
+        finally:
+            self.release()
+
+    def stats(self):
+        with self._condition:
+            return {
+                "active": self._active,
+                "max_concurrent": self.max_concurrent,
+                "waiting": sum(len(queue) for queue in self._queues.values()),
+                "waiting_sessions": len(self._queues),
+                "max_wait": self.max_wait,
+            }
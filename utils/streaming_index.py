@@ -0,0 +1,85 @@
+import itertools
+
+import numpy as np
+
+from config import EMBEDDING_BATCH_SIZE, EMBEDDING_MODEL, FAISS_INDEX_SPEC, FAISS_TRAIN_SAMPLE_SIZE
+from utils.embedding_model import encode
+from utils.index_builder import create_id_index, create_index, needs_training, train_index
+
+def iter_batches(items, batch_size=EMBEDDING_BATCH_SIZE):
+    """
+    Yields lists of up to batch_size items from any iterable without materializing it.
+    """
+    iterator = iter(items)
+    while True:
+        batch = list(itertools.islice(iterator, batch_size))
+        if not batch:
+            return
+        yield batch
+
+def encode_in_batches(sentences, batch_size=EMBEDDING_BATCH_SIZE, model_name=EMBEDDING_MODEL):
+    """
+    Yields (batch_sentences, float32 embeddings) for consecutive batches of a sentence stream.
+    """
+    for batch in iter_batches(sentences, batch_size):
+        embeddings = np.ascontiguousarray(encode(batch, model_name=model_name), dtype="float32")
+        yield batch, embeddings
+
+def build_index_streaming(sentences, index=None, batch_size=EMBEDDING_BATCH_SIZE,
+                          model_name=EMBEDDING_MODEL, sentence_sink=None,
+                          index_spec=FAISS_INDEX_SPEC, sample_size=FAISS_TRAIN_SAMPLE_SIZE, id_start=None):
+    """
+    Encodes a sentence stream batch by batch and adds each batch to a FAISS index as it goes,
+    so peak memory is bounded by batch_size rather than by the corpus.
+
+    If no index is given one is created from index_spec. Index types that need training hold back
+    the first sample_size vectors, train on them, then continue streaming. Sentences are appended
+    to sentence_sink (a new list by default) in index order. Returns (index, sentence_sink).
+
+    With id_start set, vectors get the explicit ids id_start, id_start + 1, ... and a newly created
+    index is an id-mapped one (see create_id_index), so they can later be removed by id.
+    """
+    if sentence_sink is None:
+        sentence_sink = []
+    pending = []
+    pending_count = 0
+    next_id = id_start
+
+    def new_index(dimension, num_vectors=None):
+        if id_start is None:
+            return create_index(dimension, index_spec, num_vectors=num_vectors)
+        return create_id_index(dimension, index_spec, num_vectors=num_vectors)
+
+    def add(index, embeddings):
+        nonlocal next_id
+        if next_id is None:
+            index.add(embeddings)
+            return
+        ids = np.arange(next_id, next_id + len(embeddings), dtype="int64")
+        index.add_with_ids(embeddings, ids)
+        next_id += len(embeddings)
+
+    def flush_pending(index):
+        sample = np.vstack(pending)
+        if index is None:
+            index = new_index(sample.shape[1], num_vectors=len(sample))
+        train_index(index, sample)
+        add(index, sample)
+        pending.clear()
+        return index
+
+    for batch, embeddings in encode_in_batches(sentences, batch_size, model_name):
+        sentence_sink.extend(batch)
+        if index is None and not needs_training(index_spec):
+            index = new_index(embeddings.shape[1])
+        if index is not None and index.is_trained:
+            add(index, embeddings)
+            continue
+        pending.append(embeddings)
+        pending_count += len(embeddings)
+        if pending_count >= sample_size:
+            index = flush_pending(index)
+
+    if pending:
+        index = flush_pending(index)
+    return index, sentence_sink
@@ -0,0 +1,122 @@
+import hashlib
+import re
+from collections import Counter
+
+from config import BOILERPLATE_MIN_PAGE_FRACTION, CHUNK_MERGE_TARGET_CHARS
+
+# Bare page numbers and "Page 3 of 10" style footers
+PAGE_NUMBER_PATTERN = re.compile(r"^(page\s*)?[-–—\s]*\d+[-–—\s]*((of|/)\s*\d+)?$", re.IGNORECASE)
+
+def new_chunk_stats():
+    """
+    Returns an empty counter dict for the cleaning stage.
+    """
+    return {"input_lines": 0, "blank": 0, "boilerplate": 0, "duplicates": 0, "output_chunks": 0}
+
+def removed_count(stats):
+    """
+    Returns how many input lines the cleaning stage dropped.
+    """
+    return stats["blank"] + stats["boilerplate"] + stats["duplicates"]
+
+def normalize_line(line):
+    """
+    Collapses runs of whitespace and strips the ends of a line.
+    """
+    return " ".join(line.split())
+
+def line_key(line):
+    """
+    Hash used to spot duplicate lines regardless of case and spacing.
+    """
+    return hashlib.sha1(normalize_line(line).casefold().encode("utf-8")).digest()
+
+def find_boilerplate_lines(pages, min_fraction=BOILERPLATE_MIN_PAGE_FRACTION, min_pages=3):
+    """
+    Returns the keys of lines that repeat on many pages of one document, such as headers and footers.
+    """
+    if len(pages) < min_pages:
+        return set()
+    page_counts = Counter()
+    for page in pages:
+        page_counts.update({line_key(line) for line in page.split("\n") if line.strip()})
+    threshold = max(min_pages, min_fraction * len(pages))
+    return {key for key, count in page_counts.items() if count >= threshold}
+
+def clean_lines(pages, seen=None, stats=None, min_fraction=BOILERPLATE_MIN_PAGE_FRACTION):
+    """
+    Yields the lines of a document's pages without blanks, page numbers, repeated headers/footers
+    and lines already in `seen` (a set of line keys, shared across documents to dedup them too).
+    """
+    seen = set() if seen is None else seen
+    stats = new_chunk_stats() if stats is None else stats
+    boilerplate = find_boilerplate_lines(pages, min_fraction)
+
+    for page in pages:
+        for raw_line in page.split("\n"):
+            stats["input_lines"] += 1
+            line = normalize_line(raw_line)
+            if not line:
+                stats["blank"] += 1
+                continue
+            key = line_key(line)
+            if key in boilerplate or PAGE_NUMBER_PATTERN.match(line):
+                stats["boilerplate"] += 1
+                continue
+            if key in seen:
+                stats["duplicates"] += 1
+                continue
+            seen.add(key)
+            yield line
+
+def merge_fragments(lines, target_chars=CHUNK_MERGE_TARGET_CHARS):
+    """
+    Joins consecutive short lines into passages of at least target_chars characters.
+    A target of 0 passes lines through unchanged.
+    """
+    if target_chars <= 0:
+        yield from lines
+        return
+    passage = []
+    length = 0
+    for line in lines:
+        passage.append(line)
+        length += len(line) + 1
+        if length >= target_chars:
+            yield " ".join(passage)
+            passage, length = [], 0
+    if passage:
+        yield " ".join(passage)
+
+def chunk_documents(documents, merge_target=CHUNK_MERGE_TARGET_CHARS, min_fraction=BOILERPLATE_MIN_PAGE_FRACTION):
+    """
+    Cleans, deduplicates and optionally merges the lines of several documents, each given as a list of pages.
+    Returns (chunks, stats).
+    """
+    seen = set()
+    stats = new_chunk_stats()
+    chunks = []
+    for pages in documents:
+        chunks.extend(merge_fragments(clean_lines(pages, seen, stats, min_fraction), merge_target))
+    stats["output_chunks"] = len(chunks)
+    return chunks, stats
+
+def dedup_sentences(sentences, seen=None, stats=None):
+    """
+    Yields non-blank sentences that have not been seen before.
+    """
+    seen = set() if seen is None else seen
+    stats = new_chunk_stats() if stats is None else stats
+    for sentence in sentences:
+        stats["input_lines"] += 1
+        sentence = normalize_line(sentence)
+        if not sentence:
+            stats["blank"] += 1
+            continue
+        key = line_key(sentence)
+        if key in seen:
+            stats["duplicates"] += 1
+            continue
+        seen.add(key)
+        stats["output_chunks"] += 1
+        yield sentence
@@ -0,0 +1,110 @@
+import hashlib
+import os
+import threading
+import uuid
+
+import numpy as np
+
+from config import EMBEDDING_MODEL, UPLOAD_CACHE_DIR, UPLOAD_CACHE_MAX_BYTES
+from utils.logger import setup_logger
+
+logger = setup_logger()
+
+def file_content_hash(data):
+    """
+    Returns the SHA-256 hex digest of a file's raw bytes.
+    """
+    return hashlib.sha256(data).hexdigest()
+
+class UploadCache:
+    """
+    On-disk cache of extracted sentences and float32 embeddings for uploaded PDFs,
+    keyed by file-content hash and embedding model, with a total size cap and LRU eviction.
+    """
+
+    def __init__(self, cache_dir=UPLOAD_CACHE_DIR, max_bytes=UPLOAD_CACHE_MAX_BYTES):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+
+    def _entry_path(self, content_hash, model_name, pipeline):
+        # pipeline identifies the cleaning settings, which change the stored sentences
+        model_hash = hashlib.sha256(f"{model_name}|{pipeline}".encode("utf-8")).hexdigest()[:16]
+        return os.path.join(self.cache_dir, f"{content_hash}-{model_hash}.npz")
+
+    def get(self, content_hash, model_name=EMBEDDING_MODEL, pipeline=""):
+        """
+        Returns (sentences, embeddings) for a cached file, or None on a miss.
+        """
+        path = self._entry_path(content_hash, model_name, pipeline)
+        try:
+            with np.load(path, allow_pickle=False) as entry:
+                sentences = entry["sentences"].tolist()
+                embeddings = entry["embeddings"]
+        except FileNotFoundError:
+            return None
+        except Exception as e:
+            logger.warning(f"Discarding unreadable upload cache entry {path}: {e}")
+            self._remove(path)
+            return None
+
+        # The modification time doubles as the LRU timestamp
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+        return sentences, embeddings
+
+    def put(self, content_hash, sentences, embeddings, model_name=EMBEDDING_MODEL, pipeline=""):
+        """
+        Stores sentences and embeddings for a file, then evicts old entries above the size cap.
+        """
+        os.makedirs(self.cache_dir, exist_ok=True)
+        path = self._entry_path(content_hash, model_name, pipeline)
+        tmp_path = f"{path}.{uuid.uuid4().hex}.tmp"
+        try:
+            # Write to a temporary file first so readers never see a partial entry
+            with open(tmp_path, "wb") as file:
+                np.savez(
+                    file,
+                    sentences=np.array(sentences, dtype=str),
+                    embeddings=np.asarray(embeddings, dtype="float32"),
+                )
+            os.replace(tmp_path, path)
+        except Exception as e:
+            logger.warning(f"Failed to write upload cache entry {path}: {e}")
+            self._remove(tmp_path)
+            return
+        self.evict()
+
+    def evict(self):
+        """
+        Removes least recently used entries until the cache fits in max_bytes.
+        """
+        with self._lock:
+            entries = []
+            for name in os.listdir(self.cache_dir):
+                if not name.endswith(".npz"):
+                    continue
+                path = os.path.join(self.cache_dir, name)
+                try:
+                    stat = os.stat(path)
+                except OSError:
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, path))
+
+            total_bytes = sum(size for _, size, _ in entries)
+            for _, size, path in sorted(entries):
+                if total_bytes <= self.max_bytes:
+                    break
+                self._remove(path)
+                total_bytes -= size
+
+    @staticmethod
+    def _remove(path):
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+upload_cache = UploadCache()